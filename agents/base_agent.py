@@ -1,43 +1,193 @@
 # multi_agent_tutor/agents/base_agent.py
-import google.generativeai as genai
-from config import GEMINI_API_KEY, DEFAULT_GEMINI_MODEL
+import asyncio
+import time
+from config import DEFAULT_GEMINI_MODEL, AGENT_MAX_MODEL_TURNS, AGENT_MAX_OUTPUT_TOKENS
+from deadlines import deadline_at
+from metrics import MODEL_TURNS, TOOL_CALLS, STAGE_LATENCY, TOKEN_BUDGET_EXHAUSTED
+from structured_logging import get_logger
+from token_usage import current_usage, record_usage
+from tracing import span, start_span
+from .llm_backend import get_backend
+from .upstream import upstream_gate, read_stream, UpstreamOverloaded
 
-# Configure the Gemini API key
-genai.configure(api_key=GEMINI_API_KEY)
+logger = get_logger("agents")
+
+UNFINISHED_ANSWER = "Sorry, I could not finish working out this answer. Please try rephrasing the question."
+
+
+class StreamedAnswerFailed(Exception):
+    """
+    A streamed answer failed, possibly after part of it was sent. Carries the apology for the
+    client; the caller must report it as an error, and never cache or store the partial answer.
+    """
 
 class BaseAgent:
-    def __init__(self, model_name=DEFAULT_GEMINI_MODEL, system_instruction=None):
+    def __init__(self, model_name=DEFAULT_GEMINI_MODEL, system_instruction=None, tools=None):
         self.model_name = model_name
-        # For newer Gemini models that support system instructions directly
-        if system_instruction:
-            self.model = genai.GenerativeModel(
-                self.model_name,
-                system_instruction=system_instruction
-            )
-        else:
-            self.model = genai.GenerativeModel(self.model_name)
-
-        self.history = [] # For potential conversation history (Bonus)
-
-    def generate_response(self, prompt_parts, stream=False):
+        self.system_instruction = system_instruction
+        self.name = type(self).__name__
+        # Tools are plain Python functions; the backend derives their function declarations
+        # from the signature and docstring, and the model calls them by function name.
+        self.tool_functions = tuple(tools or ())
+        self.tools = {tool.__name__: tool for tool in self.tool_functions}
+
+    @property
+    def backend(self):
+        # The backend (Gemini or the offline fake) is shared process-wide; see LLM_BACKEND.
+        # It is resolved on first use, so constructing an agent never imports or configures an SDK.
+        return get_backend()
+
+    def model_spec(self) -> tuple:
+        """The (model name, system instruction, tools) combination this agent generates with."""
+        return self.model_name, self.system_instruction, self.tool_functions
+
+    async def generate_response(self, prompt_parts, stream=False, history=None, deadline=None):
         """
-        Generates a response from the Gemini model.
+        Generates a response from the LLM backend without blocking the event loop.
         Can handle single prompts or chat history.
+        If the agent has tools, tool calls requested by the model are executed (several per turn,
+        concurrently) and fed back, for at most AGENT_MAX_MODEL_TURNS model turns.
+        `history` is the caller's per-session conversation; agents are shared across requests and hold none themselves.
+        With stream=True, returns an async iterator that yields text chunks as they arrive; every
+        model call and every chunk must then arrive before `deadline` (a time.monotonic() value).
         """
+        if stream:
+            return self._stream_response(prompt_parts, history, deadline)
         try:
-            # For chat-based interaction (maintains history):
-            chat = self.model.start_chat(history=self.history)
-            response = chat.send_message(prompt_parts)
+            contents = self._build_contents(prompt_parts, history)
+            response = None
+            for turn in range(1, AGENT_MAX_MODEL_TURNS + 1):
+                options = self._turn_options(turn)
+                with STAGE_LATENCY.time(stage=self._generation_stage(turn), agent=self.name), \
+                        span("model_turn", agent=self.name, turn=turn) as turn_span:
+                    response = await upstream_gate.call(
+                        lambda model: self.backend.generate(model, contents, **options),
+                        contents, call_site=self.name, model_name=self.model_name,
+                    )
+                    turn_span.set(prompt_tokens=response.prompt_tokens, output_tokens=response.output_tokens,
+                                  tool_calls=len(response.tool_calls))
+                if not response.tool_calls:
+                    MODEL_TURNS.observe(turn, agent=self.name)
+                    return response.text # For non-streaming
+                contents.append(response.model_turn)
+                contents.append(await self._run_tool_calls(response.tool_calls))
+            return self._unfinished_answer(response.text if response else "")
 
-            return response.text # For non-streaming
+        except UpstreamOverloaded:
+            raise # Surfaced to the client as 429/503 with Retry-After instead of an apology
+        except Exception as e:
+            return self._error_message(e)
 
+    async def _stream_response(self, prompt_parts, history, deadline):
+        try:
+            contents = self._build_contents(prompt_parts, history)
+            response = None
+            for turn in range(1, AGENT_MAX_MODEL_TURNS + 1):
+                # Measured up to the last chunk, so it includes the time the client takes to read the stream.
+                stage_start = time.perf_counter()
+                turn_span = start_span("model_turn", agent=self.name, turn=turn, stream=True)
+                options = self._turn_options(turn)
+                try:
+                    with deadline_at(deadline):
+                        stream = await upstream_gate.call(
+                            lambda model: self.backend.stream(model, contents, **options),
+                            contents, call_site=self.name, model_name=self.model_name,
+                        )
+                    try:
+                        async for text in read_stream(stream, deadline, self.name):
+                            yield text
+                    finally:
+                        # Frees the upstream slot at once if the client went away mid-stream.
+                        await stream.aclose()
+                except BaseException as e:
+                    turn_span.end(e)
+                    raise
+                STAGE_LATENCY.observe(time.perf_counter() - stage_start, stage=self._generation_stage(turn), agent=self.name)
+                # The stream has aggregated every chunk by now.
+                response = stream.response
+                record_usage(self.name, response)
+                turn_span.set(prompt_tokens=response.prompt_tokens, output_tokens=response.output_tokens,
+                              tool_calls=len(response.tool_calls))
+                turn_span.end()
+                if not response.tool_calls:
+                    MODEL_TURNS.observe(turn, agent=self.name)
+                    return
+                contents.append(response.model_turn)
+                contents.append(await self._run_tool_calls(response.tool_calls))
+            # Whatever text the last turn had was streamed already.
+            if not (response and response.text):
+                yield self._unfinished_answer("")
+        except UpstreamOverloaded:
+            raise
         except Exception as e:
-            print(f"Error generating response with Gemini: {e}")
-            if hasattr(e, 'response') and e.response:
-                print(f"Gemini API Response Error: {e.response}")
-                if hasattr(e.response, 'prompt_feedback') and e.response.prompt_feedback and hasattr(e.response.prompt_feedback, 'block_reason') and e.response.prompt_feedback.block_reason: # Check added
-                    return f"Sorry, my response was blocked. Reason: {e.response.prompt_feedback.block_reason_message or e.response.prompt_feedback.block_reason}"
-            return "Sorry, I encountered an error while trying to generate a response."
-
-    def clear_history(self):
-        self.history = []
\ No newline at end of file
+            # Text already sent can't be taken back; an apology appended to it would read as
+            # part of the answer, so the failure is raised for the caller to report.
+            raise StreamedAnswerFailed(self._error_message(e)) from e
+
+    def _unfinished_answer(self, text: str) -> str:
+        """
+        The answer when the last allowed turn still requested tools (the backend ignored
+        allow_tool_calls=False, or AGENT_MAX_MODEL_TURNS is 0): that turn's text, if any.
+        """
+        MODEL_TURNS.observe(AGENT_MAX_MODEL_TURNS, agent=self.name)
+        logger.warning("Model turns exhausted without a final answer", extra={"agent": self.name})
+        return text or UNFINISHED_ANSWER
+
+    def _turn_options(self, turn: int) -> dict:
+        # On the last allowed model turn, or once the request has spent its token budget,
+        # the model must answer instead of requesting more tools.
+        allow_tool_calls = turn < AGENT_MAX_MODEL_TURNS
+        usage = current_usage()
+        if allow_tool_calls and self.tool_functions and usage is not None and usage.exhausted:
+            TOKEN_BUDGET_EXHAUSTED.inc(agent=self.name)
+            allow_tool_calls = False
+        return {
+            "system_instruction": self.system_instruction,
+            "tools": self.tool_functions,
+            "allow_tool_calls": allow_tool_calls,
+            "max_output_tokens": AGENT_MAX_OUTPUT_TOKENS,
+        }
+
+    @staticmethod
+    def _generation_stage(turn: int) -> str:
+        return "first_generation" if turn == 1 else "final_generation"
+
+    async def _run_tool_calls(self, tool_calls):
+        """Runs every tool call from one model turn concurrently and returns the turn that reports their results."""
+        with STAGE_LATENCY.time(stage="tool_execution", agent=self.name):
+            results = await asyncio.gather(*(self._call_tool(call) for call in tool_calls))
+        return self.backend.tool_results_turn(list(zip(tool_calls, results)))
+
+    async def _call_tool(self, tool_call) -> dict:
+        tool_name = tool_call.name
+        tool_args = tool_call.args
+        TOOL_CALLS.inc(agent=self.name, tool=tool_name)
+        tool = self.tools.get(tool_name)
+        if tool is None:
+            return {"error": f"Unknown tool '{tool_name}'."}
+        logger.debug("Calling tool", extra={"agent": self.name, "tool": tool_name, "tool_args": tool_args})
+        with span(f"tool.{tool_name}", agent=self.name) as tool_span:
+            try:
+                # Tools are synchronous; a worker thread keeps the event loop free while they run.
+                result = await asyncio.to_thread(tool, **tool_args)
+            except Exception as e:
+                logger.warning("Tool failed", extra={"agent": self.name, "tool": tool_name, "error": str(e)})
+                tool_span.set(error=str(e))
+                return {"error": str(e)}
+        return result if isinstance(result, dict) else {"result": result}
+
+    @staticmethod
+    def _build_contents(prompt_parts, history):
+        """
+        The prompt becomes the next user turn after any session history, so contents can go
+        straight to the backend without a ChatSession.
+        """
+        return list(history or []) + [{"role": "user", "parts": list(prompt_parts)}]
+
+    def _error_message(self, e) -> str:
+        logger.error("Error generating response", extra={"agent": self.name, "backend": self.backend.name, "error": str(e)})
+        if hasattr(e, 'response') and e.response:
+            logger.error("LLM API response error", extra={"agent": self.name, "payload": str(e.response), "verbose": True})
+            if hasattr(e.response, 'prompt_feedback') and e.response.prompt_feedback and hasattr(e.response.prompt_feedback, 'block_reason') and e.response.prompt_feedback.block_reason: # Check added
+                return f"Sorry, my response was blocked. Reason: {e.response.prompt_feedback.block_reason_message or e.response.prompt_feedback.block_reason}"
+        return "Sorry, I encountered an error while trying to generate a response."
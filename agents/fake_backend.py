@@ -0,0 +1,152 @@
+# multi_agent_tutor/agents/fake_backend.py
+"""
+Deterministic offline LLM backend for benchmarks and CI (LLM_BACKEND=fake).
+
+Each call sleeps for the configured latency, fails with the configured error rate, and
+otherwise returns the next scripted response or, once the script is exhausted, a
+rule-based one: classifier prompts get a category, agents with tools get tool calls
+for the calculations/constants in the query, and tool results get a short answer.
+"""
+import asyncio
+import json
+import random
+import re
+from collections import deque
+from config import FAKE_LLM_LATENCY_SECONDS, FAKE_LLM_LATENCY_JITTER_SECONDS, FAKE_LLM_ERROR_RATE, FAKE_LLM_SEED
+from .llm_backend import LLMBackend, LLMResponse, LLMStream, ToolCall, QuotaExceeded, TransientUpstreamError
+from .router import KeywordRouter
+from .tools.constants_store import get_index
+
+NUMBERED_QUERY = re.compile(r'^\s*(\d+)\. "(.*)"\s*$', re.MULTILINE)
+CLASSIFIER_QUERY = re.compile(r'"(.*)"\s*Category:', re.DOTALL)
+ARITHMETIC_EXPRESSION = re.compile(r"\d+(?:\.\d+)?(?:\s*[-+*/]\s*\(?\d+(?:\.\d+)?\)?)+")
+STREAM_CHUNK_WORDS = 4
+
+
+class FakeBackend(LLMBackend):
+    name = "fake"
+
+    def __init__(self, responses=(), latency_seconds=FAKE_LLM_LATENCY_SECONDS,
+                 latency_jitter_seconds=FAKE_LLM_LATENCY_JITTER_SECONDS, error_rate=FAKE_LLM_ERROR_RATE,
+                 seed=FAKE_LLM_SEED):
+        """
+        `responses` is a script consumed one item per call: a str (text answer), a list of
+        ToolCall (a tool-request turn), an LLMResponse, or an Exception instance to raise.
+        """
+        self.script = deque(responses)
+        self.latency_seconds = latency_seconds
+        self.latency_jitter_seconds = latency_jitter_seconds
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._router = KeywordRouter()
+        self.calls = 0
+        self.errors = 0
+
+    async def generate(self, model_name, contents, system_instruction=None, tools=(), allow_tool_calls=True,
+                       max_output_tokens=None) -> LLMResponse:
+        await self._simulate_call()
+        return self._next_response(contents, system_instruction, tools, allow_tool_calls, max_output_tokens)
+
+    async def stream(self, model_name, contents, system_instruction=None, tools=(), allow_tool_calls=True,
+                     max_output_tokens=None) -> LLMStream:
+        await self._simulate_call()
+        response = self._next_response(contents, system_instruction, tools, allow_tool_calls, max_output_tokens)
+
+        async def items():
+            words = response.text.split(" ") if response.text else []
+            for i in range(0, len(words), STREAM_CHUNK_WORDS):
+                chunk = " ".join(words[i:i + STREAM_CHUNK_WORDS])
+                yield chunk if i + STREAM_CHUNK_WORDS >= len(words) else chunk + " "
+                await asyncio.sleep(0)
+            yield response
+
+        return LLMStream(items())
+
+    def tool_results_turn(self, results):
+        return {"role": "user", "parts": [{"tool_result": {"name": call.name, "response": result}} for call, result in results]}
+
+    async def _simulate_call(self):
+        self.calls += 1
+        delay = self.latency_seconds + self._random.uniform(0, self.latency_jitter_seconds)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.error_rate > 0 and self._random.random() < self.error_rate:
+            self.errors += 1
+            if self._random.random() < 0.5:
+                raise QuotaExceeded("Fake backend: quota exceeded")
+            raise TransientUpstreamError("Fake backend: service unavailable")
+
+    def _next_response(self, contents, system_instruction, tools, allow_tool_calls, max_output_tokens) -> LLMResponse:
+        if self.script:
+            item = self.script.popleft()
+            if isinstance(item, Exception):
+                raise item
+            if isinstance(item, LLMResponse):
+                response = item
+            elif isinstance(item, str):
+                response = LLMResponse(text=item)
+            else:
+                response = LLMResponse(tool_calls=list(item))
+        else:
+            response = self._rule_based_response(contents, tools, allow_tool_calls)
+        if response.tool_calls and response.model_turn is None:
+            response.model_turn = {"role": "model", "parts": [{"tool_call": {"name": c.name, "args": c.args}} for c in response.tool_calls]}
+        if max_output_tokens and len(response.text) > max_output_tokens * 4:
+            response.text = response.text[:max_output_tokens * 4]
+        # Like the real API, the system instruction and earlier tool calls and results count as prompt.
+        response.prompt_tokens = response.prompt_tokens or self._count_tokens(contents) + len(system_instruction or "") // 4
+        response.output_tokens = response.output_tokens or len(response.text) // 4 + 1
+        return response
+
+    def _rule_based_response(self, contents, tools, allow_tool_calls) -> LLMResponse:
+        last_turn = contents[-1] if isinstance(contents, list) and contents else contents
+        tool_results = [part["tool_result"] for part in self._parts(last_turn) if isinstance(part, dict) and "tool_result" in part]
+        if tool_results:
+            summary = "; ".join(f"{r['name']} -> {r['response']}" for r in tool_results)
+            return LLMResponse(text=f"Using the tool results ({summary}), here is the answer.")
+
+        prompt = self._text_of(last_turn)
+        if "<number>: <category>" in prompt:  # batch classifier
+            lines = [f"{n}: {self._router.classify(query)[0]}" for n, query in NUMBERED_QUERY.findall(prompt)]
+            return LLMResponse(text="\n".join(lines))
+        if "Category:" in prompt:
+            # Classify the quoted query, not the category names listed in the instructions.
+            query = CLASSIFIER_QUERY.search(prompt)
+            return LLMResponse(text=self._router.classify(query.group(1) if query else prompt)[0])
+
+        if tools and allow_tool_calls:
+            tool_names = {getattr(tool, "__name__", tool) for tool in tools}
+            calls = []
+            if "simple_calculator" in tool_names:
+                calls += [ToolCall("simple_calculator", {"expression": m.group(0)}) for m in ARITHMETIC_EXPRESSION.finditer(prompt)]
+            constants = get_index().find_in_text(prompt) if tool_names & {"get_physics_constant", "get_physics_constants"} else []
+            if len(constants) > 1 and "get_physics_constants" in tool_names:
+                calls.append(ToolCall("get_physics_constants", {"constant_names": [c.name for c in constants]}))
+            elif "get_physics_constant" in tool_names:
+                calls += [ToolCall("get_physics_constant", {"constant_name": c.name}) for c in constants]
+            if calls:
+                return LLMResponse(tool_calls=calls)
+
+        return LLMResponse(text=f"Here is a fake answer to: {prompt[-200:]}")
+
+    @classmethod
+    def _count_tokens(cls, contents) -> int:
+        """About four characters per token, over text and structured (tool) parts alike."""
+        turns = contents if isinstance(contents, list) else [contents]
+        chars = sum(len(part) if isinstance(part, str) else len(json.dumps(part, default=str))
+                    for turn in turns for part in cls._parts(turn))
+        return chars // 4 + 1
+
+    @staticmethod
+    def _parts(turn):
+        if isinstance(turn, dict):
+            return turn.get("parts", ())
+        if isinstance(turn, str):
+            return (turn,)
+        return ()
+
+    @classmethod
+    def _text_of(cls, contents) -> str:
+        if isinstance(contents, list):
+            return " ".join(cls._text_of(turn) for turn in contents)
+        return " ".join(part for part in cls._parts(contents) if isinstance(part, str))
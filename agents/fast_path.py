@@ -0,0 +1,81 @@
+# multi_agent_tutor/agents/fast_path.py
+import re
+from .tools.calculator import simple_calculator
+from .tools.constants_store import get_index
+
+ARITHMETIC_TEMPLATE = "{expression} = {result}"
+CONSTANT_TEMPLATE = "The {name} ({symbol}) is {value} {unit}."
+
+_LEAD_IN = r"^\s*(?:what\s+is|what's|whats|calculate|compute|evaluate|find)?\s*(?:the\s+)?(?:(?:numerical\s+)?value\s+of\s+)?(?:the\s+)?"
+_TRAILER = r"\s*[?.!=]*\s*$"
+
+# Only digits, whitespace and arithmetic symbols, with at least one operator between operands.
+ARITHMETIC_QUERY = re.compile(_LEAD_IN + r"(?P<expr>[\d\s.()+\-*/^×÷x]+?)" + _TRAILER, re.IGNORECASE)
+HAS_OPERATION = re.compile(r"\d[\s.)]*[+\-*/^×÷x]")
+CONSTANT_QUERY = re.compile(_LEAD_IN + r"(?P<name>[a-z][a-z '_-]*?)" + _TRAILER, re.IGNORECASE)
+VALUE_MARKER = re.compile(r"\bvalue\s+of\b|\bconstant\b", re.IGNORECASE)
+
+
+def _to_python_operators(expression: str) -> str:
+    expression = expression.replace("^", "**").replace("×", "*").replace("÷", "/")
+    # "17 x 23" -> "17 * 23"
+    return re.sub(r"(?<=[\d)])\s*x\s*(?=[\d(])", "*", expression, flags=re.IGNORECASE)
+
+
+def answer_arithmetic(query: str):
+    """Answers a bare arithmetic expression like 'what is 17*23' with the calculator tool."""
+    match = ARITHMETIC_QUERY.match(query)
+    if not match or not HAS_OPERATION.search(match.group("expr")):
+        return None
+    expression = match.group("expr").strip()
+    # The calculator engine caps exponents and magnitudes, so inputs like "9^9^9" fail fast.
+    result = simple_calculator(_to_python_operators(expression))
+    if result.startswith("Error"):
+        return None
+    return ARITHMETIC_TEMPLATE.format(expression=expression, result=result)
+
+
+def answer_constant_lookup(query: str):
+    """
+    Answers a bare constant lookup like 'value of planck constant' with the constants tool.
+    Only an exact name, alias or (when the query asks for a value) symbol answers, and the
+    answer names the matched constant; near misses and conceptual questions such as 'what
+    is light' reach an agent, whose tool call does the forgiving lookup.
+    """
+    match = CONSTANT_QUERY.match(query)
+    if not match:
+        return None
+    name = match.group("name").strip()
+    if VALUE_MARKER.search(query):
+        constant = get_index().lookup_exact(name)
+    elif " " in name.strip(" '_-"):
+        # Single words ("gravity", "e") are too ambiguous without an explicit value request.
+        constant = get_index().lookup_exact(name, symbols=False)
+    else:
+        return None
+    if constant is None:
+        return None
+    return CONSTANT_TEMPLATE.format(name=constant.name, symbol=constant.symbol, value=constant.value, unit=constant.unit).replace(" .", ".")
+
+
+def try_fast_path(query: str):
+    """
+    Deterministic pre-pass that answers pure arithmetic and constant lookups without any LLM call.
+    Returns a (kind, answer) tuple, or None if the query needs the agent pipeline.
+    """
+    answer = answer_arithmetic(query)
+    if answer is not None:
+        return "arithmetic", answer
+    answer = answer_constant_lookup(query)
+    if answer is not None:
+        return "constant", answer
+    return None
+
+# Example Usage (for testing)
+if __name__ == "__main__":
+    for q in ["what is 17*23", "17 x 23", "Calculate (2 + 3) ^ 2?", "value of planck constant",
+              "What is the speed of light?", "what is light", "value of gravity", "value of G", "value of plank constant",
+              "value of e", "value of a", "value of m", "value of mass", "value of electron",
+              "what is the value of the constant", "what is avogadro's number", "solve 2x + 5 = 11",
+              "Explain the Pythagorean theorem.", "what is 10 / 0", "what is 9^9^9", "2^10"]:
+        print(f"{q!r}: {try_fast_path(q)}")
@@ -0,0 +1,116 @@
+# multi_agent_tutor/agents/gemini_backend.py
+import asyncio
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from config import GEMINI_API_KEY, WARMUP_TIMEOUT_SECONDS
+from structured_logging import get_logger
+from .llm_backend import LLMBackend, LLMResponse, LLMStream, ToolCall, QuotaExceeded, TransientUpstreamError
+from .model_registry import get_model
+
+logger = get_logger("agents")
+
+# On the last allowed model turn the model must answer instead of requesting more tools.
+NO_MORE_TOOLS = {"function_calling_config": {"mode": "none"}}
+
+TRANSIENT_ERRORS = (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.GatewayTimeout,  # includes DeadlineExceeded
+)
+
+
+def _translate_errors(e: Exception):
+    if isinstance(e, google_exceptions.TooManyRequests):  # includes ResourceExhausted
+        return QuotaExceeded(str(e))
+    if isinstance(e, TRANSIENT_ERRORS):
+        return TransientUpstreamError(str(e))
+    return None
+
+
+class GeminiBackend(LLMBackend):
+    name = "gemini"
+
+    def __init__(self):
+        if not GEMINI_API_KEY:
+            raise ValueError("GEMINI_API_KEY not found in .env file or environment variables. Please ensure it is set.")
+        # Configure the Gemini API key
+        genai.configure(api_key=GEMINI_API_KEY)
+
+    async def generate(self, model_name, contents, system_instruction=None, tools=(), allow_tool_calls=True,
+                       max_output_tokens=None) -> LLMResponse:
+        model = get_model(model_name, system_instruction, tuple(tools))
+        try:
+            response = await model.generate_content_async(contents, **self._options(tools, allow_tool_calls, max_output_tokens))
+        except Exception as e:
+            translated = _translate_errors(e)
+            if translated is None:
+                raise
+            raise translated from e
+        return self._to_response(response)
+
+    async def stream(self, model_name, contents, system_instruction=None, tools=(), allow_tool_calls=True,
+                     max_output_tokens=None) -> LLMStream:
+        model = get_model(model_name, system_instruction, tuple(tools))
+        try:
+            response = await model.generate_content_async(contents, stream=True, **self._options(tools, allow_tool_calls, max_output_tokens))
+        except Exception as e:
+            translated = _translate_errors(e)
+            if translated is None:
+                raise
+            raise translated from e
+
+        async def items():
+            async for chunk in response:
+                for part in chunk.parts:
+                    if part.text:
+                        yield part.text
+            # The streamed response has aggregated every chunk by now.
+            yield self._to_response(response)
+
+        return LLMStream(items())
+
+    async def warm_up(self, model_specs):
+        # Building a model converts its system instruction and tool declarations; do it off the loop.
+        models = await asyncio.to_thread(
+            lambda: [get_model(name, system_instruction, tuple(tools)) for name, system_instruction, tools in model_specs]
+        )
+        if not models:
+            return
+        # One unbilled count_tokens call opens the shared async transport (channel, TLS, auth token).
+        try:
+            await asyncio.wait_for(models[0].count_tokens_async("warmup"), WARMUP_TIMEOUT_SECONDS)
+        except Exception as e:
+            logger.warning("Connection warmup failed", extra={"backend": self.name, "error": str(e) or type(e).__name__})
+
+    def tool_results_turn(self, results):
+        return {
+            "role": "user",
+            "parts": [
+                genai.protos.Part(function_response=genai.protos.FunctionResponse(name=call.name, response=result))
+                for call, result in results
+            ],
+        }
+
+    @staticmethod
+    def _options(tools, allow_tool_calls, max_output_tokens) -> dict:
+        options = {}
+        if tools and not allow_tool_calls:
+            options["tool_config"] = NO_MORE_TOOLS
+        if max_output_tokens:
+            options["generation_config"] = {"max_output_tokens": max_output_tokens}
+        return options
+
+    @staticmethod
+    def _to_response(response) -> LLMResponse:
+        parts = response.parts
+        usage = getattr(response, "usage_metadata", None)
+        return LLMResponse(
+            text="".join(part.text for part in parts if part.text),
+            tool_calls=[
+                ToolCall(part.function_call.name, dict(part.function_call.args or {}))
+                for part in parts if part.function_call.name
+            ],
+            model_turn=response.candidates[0].content,
+            prompt_tokens=getattr(usage, "prompt_token_count", 0) or 0,
+            output_tokens=getattr(usage, "candidates_token_count", 0) or 0,
+        )
@@ -0,0 +1,142 @@
+# multi_agent_tutor/agents/llm_backend.py
+"""
+Backend-neutral interface between the agents and an LLM provider.
+
+Agents build `contents` as a list of {"role": "user" | "model", "parts": [...]} turns,
+call `generate`/`stream`, and append the backend-specific `model_turn` and
+`tool_results_turn(...)` items when the model requests tools. `max_output_tokens` caps
+the length of the answer. Which backend is used is chosen by the LLM_BACKEND setting
+("gemini" or "fake").
+"""
+import threading
+from dataclasses import dataclass, field
+from config import LLM_BACKEND
+
+
+class QuotaExceeded(Exception):
+    """The provider rejected the call for quota/rate reasons (HTTP 429). Retryable."""
+
+
+class TransientUpstreamError(Exception):
+    """The provider failed in a way that may succeed on retry (5xx, deadline exceeded)."""
+
+
+@dataclass
+class ToolCall:
+    name: str
+    args: dict
+
+
+@dataclass
+class LLMResponse:
+    text: str = ""
+    tool_calls: list = field(default_factory=list)
+    model_turn: object = None  # backend-specific model content, appended before tool results
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.output_tokens
+
+
+class LLMStream:
+    """
+    Async iterator over text chunks of a streamed generation. Once exhausted,
+    `response` holds the aggregated LLMResponse (including any tool calls).
+    Callbacks registered with `on_close` run once, when the stream is used up,
+    fails, or is closed early with `aclose()`.
+    """
+
+    def __init__(self, items):
+        self._items = items  # async iterator of str chunks, ending with one LLMResponse
+        self.response = None
+        self._close_callbacks = []
+        self._closed = False
+
+    def on_close(self, callback):
+        self._close_callbacks.append(callback)
+
+    async def __aiter__(self):
+        try:
+            async for item in self._items:
+                if isinstance(item, LLMResponse):
+                    self.response = item
+                else:
+                    yield item
+        finally:
+            self._close()
+
+    async def aclose(self):
+        """Stops the generation if it is still running. Safe to call more than once."""
+        if self._closed:
+            return
+        try:
+            close = getattr(self._items, "aclose", None)
+            if close is not None:
+                await close()
+        finally:
+            self._close()
+
+    def _close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for callback in self._close_callbacks:
+            callback()
+
+
+class LLMBackend:
+    name = "base"
+
+    async def generate(self, model_name, contents, system_instruction=None, tools=(), allow_tool_calls=True,
+                       max_output_tokens=None) -> LLMResponse:
+        raise NotImplementedError
+
+    async def stream(self, model_name, contents, system_instruction=None, tools=(), allow_tool_calls=True,
+                     max_output_tokens=None) -> LLMStream:
+        raise NotImplementedError
+
+    def tool_results_turn(self, results) -> object:
+        """Builds the content item that returns [(ToolCall, result_dict), ...] to the model."""
+        raise NotImplementedError
+
+    async def warm_up(self, model_specs):
+        """
+        Prepares each (model name, system instruction, tools) combination, and any connection
+        to the provider, so the first real request skips that setup. Best effort; optional.
+        """
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> LLMBackend:
+    """Returns the process-wide backend selected by LLM_BACKEND, creating it on first use."""
+    global _backend
+    if _backend is None:
+        # Startup warmup may build the backend in a worker thread while a request asks for it.
+        with _backend_lock:
+            if _backend is None:
+                _backend = _create_backend()
+    return _backend
+
+
+def _create_backend() -> LLMBackend:
+    # Provider SDKs are imported here, not at module level, so importing the app stays fast
+    # and works without credentials.
+    if LLM_BACKEND == "fake":
+        from .fake_backend import FakeBackend
+        return FakeBackend()
+    if LLM_BACKEND == "gemini":
+        from .gemini_backend import GeminiBackend
+        return GeminiBackend()
+    raise ValueError(f"Unknown LLM_BACKEND '{LLM_BACKEND}'. Use 'gemini' or 'fake'.")
+
+
+def set_backend(backend: LLMBackend):
+    """Replaces the process-wide backend (used by benchmarks to install a configured fake)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,31 @@
+# multi_agent_tutor/agents/model_registry.py
+import threading
+import google.generativeai as genai
+
+# GenerativeModel objects are cheap to share but not free to build (system-instruction and
+# tool-declaration conversion, request defaults). Each (model, system instruction, tools)
+# combination is built once per process; every instance then lazily attaches to the SDK's
+# process-wide default sync and async clients, so all agents share one transport and
+# connection pool.
+_models = {}
+_lock = threading.Lock()
+
+
+def get_model(model_name: str, system_instruction=None, tools=()) -> genai.GenerativeModel:
+    """
+    Returns the shared GenerativeModel for this model name, system instruction and tuple of
+    tool functions, building it on first use.
+    """
+    key = (model_name, system_instruction, tools)
+    model = _models.get(key)
+    if model is None:
+        with _lock:
+            model = _models.get(key)
+            if model is None:
+                model = genai.GenerativeModel(
+                    model_name,
+                    system_instruction=system_instruction or None,
+                    tools=list(tools) or None,
+                )
+                _models[key] = model
+    return model
@@ -0,0 +1,55 @@
+# multi_agent_tutor/agents/prompts.py
+"""
+Every prompt the tutor sends to the model.
+
+Standing guidance lives in each agent's short, fixed system instruction; the per-turn
+prompt is the student's query and nothing else. Tool usage is described by the tools'
+own declarations, so the instructions only say when to use them.
+"""
+import hashlib
+
+CLASSIFIER_PROMPT_TEMPLATE = (
+    "Classify the student query as math, physics or general. Reply with the category only.\n"
+    "Query: \"{query}\"\n"
+    "Category:"
+)
+
+BATCH_CLASSIFIER_PROMPT_TEMPLATE = (
+    "Classify each numbered student query as math, physics or general. "
+    "Reply with one line per query, \"<number>: <category>\", and nothing else.\n"
+    "{queries}"
+)
+
+# Output caps for the classifier: one category word, or one "<number>: <category>" line per query.
+CLASSIFIER_MAX_OUTPUT_TOKENS = 5
+BATCH_CLASSIFIER_MAX_OUTPUT_TOKENS_PER_QUERY = 6
+
+GENERAL_SYSTEM_INSTRUCTION = (
+    "You are a helpful general knowledge tutor. Answer the student's question clearly and accurately."
+)
+
+MATH_SYSTEM_INSTRUCTION = (
+    "You are a math tutor. Use the simple_calculator tool for any arithmetic instead of calculating "
+    "yourself, requesting independent calculations together in one turn. "
+    "Explain step by step where it helps."
+)
+
+PHYSICS_SYSTEM_INSTRUCTION = (
+    "You are a physics tutor. Never guess a physical constant: look it up with get_physics_constant, "
+    "or several at once with get_physics_constants. Explain concepts clearly."
+)
+
+
+def _version(*prompts) -> str:
+    digest = hashlib.sha256()
+    for prompt in prompts:
+        digest.update(prompt.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:12]
+
+
+# Short hash of every prompt that shapes an answer; cached answers are keyed on it.
+PROMPT_VERSION = _version(
+    CLASSIFIER_PROMPT_TEMPLATE, BATCH_CLASSIFIER_PROMPT_TEMPLATE,
+    GENERAL_SYSTEM_INSTRUCTION, MATH_SYSTEM_INSTRUCTION, PHYSICS_SYSTEM_INSTRUCTION,
+)
@@ -0,0 +1,98 @@
+# multi_agent_tutor/agents/router.py
+import re
+
+# Weighted subject vocabulary. Single words and multi-word phrases are both
+# allowed; phrases are matched as n-grams over the tokenized query.
+SUBJECT_TERMS = {
+    "math": {
+        2.0: ["math", "maths", "mathematics", "algebra", "calculus", "geometry", "trigonometry",
+              "integral", "integrate", "derivative", "differentiate", "equation", "quadratic",
+              "polynomial", "theorem", "pythagorean", "logarithm", "matrix", "matrices",
+              "arithmetic", "factorial", "square root", "prime number", "greatest common divisor",
+              "least common multiple", "probability", "statistics"],
+        1.0: ["calculate", "solve", "number", "numbers", "fraction", "fractions", "percent",
+              "percentage", "multiply", "multiplied", "divide", "divided", "sum", "product",
+              "triangle", "circle", "area", "perimeter", "angle", "slope", "graph", "function",
+              "sine", "cosine", "tangent", "exponent", "limit", "mean", "median", "variance",
+              "times", "plus", "minus", "simplify", "factor", "inequality", "hypotenuse"],
+    },
+    "physics": {
+        2.0: ["physics", "thermodynamics", "relativity", "quantum", "newton's", "newtons law",
+              "gravitational", "kinematics", "electromagnetism", "speed of light", "planck",
+              "boltzmann", "black hole", "kinetic energy", "potential energy", "momentum",
+              "acceleration", "friction", "torque", "entropy", "photon", "projectile"],
+        1.0: ["force", "energy", "motion", "gravity", "light", "velocity", "mass", "newton",
+              "electric", "magnetic", "charge", "current", "voltage", "circuit", "resistance",
+              "wave", "waves", "frequency", "wavelength", "optics", "electron", "proton",
+              "neutron", "nucleus", "atom", "atomic", "heat", "pressure", "temperature",
+              "orbit", "pendulum", "power", "work", "inertia", "constant", "field", "joule"],
+    },
+}
+
+# "17*23", "2x + 5 = 11", "3^2" ...
+ARITHMETIC_PATTERN = re.compile(r"\d\s*[-+*/^=×÷]\s*[\d(a-z]")
+ARITHMETIC_WEIGHT = 2.0
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+MAX_NGRAM = 4
+
+# Smoothing term so a single weak keyword never looks certain.
+CONFIDENCE_PRIOR = 1.0
+
+
+class KeywordRouter:
+    """
+    Local query classifier backed by a precomputed n-gram -> subject weight index.
+
+    Classification is a dictionary lookup per n-gram of the query, so it runs in
+    microseconds and can decide most queries without an LLM round trip.
+    """
+
+    def __init__(self, subject_terms=SUBJECT_TERMS):
+        self.subjects = tuple(subject_terms)
+        self.index = {}
+        for subject, weighted_terms in subject_terms.items():
+            for weight, terms in weighted_terms.items():
+                for term in terms:
+                    ngram = tuple(TOKEN_PATTERN.findall(term.lower()))
+                    scores = self.index.setdefault(ngram, {})
+                    scores[subject] = max(scores.get(subject, 0.0), weight)
+
+    def scores(self, query: str) -> dict:
+        """Returns the accumulated keyword weight per subject for a query."""
+        query_lower = query.lower()
+        tokens = TOKEN_PATTERN.findall(query_lower)
+        totals = dict.fromkeys(self.subjects, 0.0)
+        for n in range(1, MAX_NGRAM + 1):
+            for i in range(len(tokens) - n + 1):
+                hit = self.index.get(tuple(tokens[i:i + n]))
+                if hit:
+                    for subject, weight in hit.items():
+                        totals[subject] += weight
+        if ARITHMETIC_PATTERN.search(query_lower):
+            totals["math"] = totals.get("math", 0.0) + ARITHMETIC_WEIGHT
+        return totals
+
+    def classify(self, query: str):
+        """
+        Classifies a query as 'math', 'physics' or 'general'.
+        Returns a (subject, confidence) tuple with confidence in [0, 1).
+        """
+        totals = self.scores(query)
+        ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+        best_subject, best = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        if best <= 0.0:
+            return "general", 0.0
+        confidence = (best - runner_up) / (best + CONFIDENCE_PRIOR)
+        return best_subject, confidence
+
+# Example Usage (for testing)
+if __name__ == "__main__":
+    router = KeywordRouter()
+    for q in ["Can you help me solve 2x + 5 = 11?",
+              "What is Newton's second law and the value of the gravitational constant G?",
+              "what is 17*23",
+              "Explain the Pythagorean theorem.",
+              "Who wrote Hamlet?"]:
+        print(f"{q!r}: {router.classify(q)}")
@@ -0,0 +1,285 @@
+# multi_agent_tutor/agents/tools/calculator_engine.py
+"""
+Compiled arithmetic engine behind the calculator tool.
+
+An expression is parsed once, validated against a whitelist (numbers, arithmetic
+operators, vetted math functions and constants, free variables) and flattened into
+a postfix plan that a small stack machine evaluates without recursion. Cost limits
+bound the work any expression can cause: expression length, node count, exponent
+size, round() digits and result magnitude are all capped, so inputs like "9**9**9"
+or "round(7, -10**20)" are rejected instead of pinning a worker.
+
+Compiled plans are memoized by expression text. `Plan.evaluate_many` evaluates one
+plan over arrays of variable bindings column by column, which amortizes the
+interpretation overhead across rows.
+"""
+import ast
+import math
+import operator as op
+from functools import lru_cache
+
+MAX_EXPRESSION_LENGTH = 1000
+MAX_NODES = 200
+MAX_EXPONENT = 1000
+MAX_MAGNITUDE = 1e300
+MAX_MAGNITUDE_LOG10 = 300
+MAX_ROUND_DIGITS = 308
+PLAN_CACHE_SIZE = 1024
+
+
+class CalculatorError(ValueError):
+    """Raised for invalid expressions, unsupported operations and exceeded limits."""
+
+
+def _check_magnitude(value):
+    if isinstance(value, complex):
+        raise CalculatorError("Result is not a real number.")
+    if value != value or abs(value) > MAX_MAGNITUDE:  # nan, inf, or too large
+        raise CalculatorError(f"Result magnitude exceeds the limit of {MAX_MAGNITUDE:g}.")
+    return value
+
+
+def _safe_pow(base, exponent):
+    if abs(exponent) > MAX_EXPONENT:
+        raise CalculatorError(f"Exponent {exponent} exceeds the limit of {MAX_EXPONENT}.")
+    if exponent > 0 and abs(base) > 1 and exponent * math.log10(abs(base)) > MAX_MAGNITUDE_LOG10:
+        raise CalculatorError(f"Result magnitude exceeds the limit of {MAX_MAGNITUDE:g}.")
+    return op.pow(base, exponent)
+
+
+def _safe_round(value, ndigits=None):
+    # round(n, -k) builds 10**k, so a huge ndigits would hang the worker.
+    if ndigits is None:
+        return round(value)
+    if not isinstance(ndigits, int):
+        raise CalculatorError("round() needs an integer number of digits.")
+    if abs(ndigits) > MAX_ROUND_DIGITS:
+        raise CalculatorError(f"round() digits must be within ±{MAX_ROUND_DIGITS}.")
+    return round(value, ndigits)
+
+
+def _safe_xor(left, right):
+    if not (isinstance(left, int) and isinstance(right, int)):
+        raise CalculatorError("'^' (bitwise xor) needs integers; use '**' for powers.")
+    return op.xor(left, right)
+
+
+BINARY_OPERATORS = {
+    ast.Add: op.add, ast.Sub: op.sub, ast.Mult: op.mul, ast.Div: op.truediv,
+    ast.FloorDiv: op.floordiv, ast.Mod: op.mod, ast.Pow: _safe_pow, ast.BitXor: _safe_xor,
+}
+UNARY_OPERATORS = {ast.USub: op.neg, ast.UAdd: op.pos}
+
+# Vetted functions: name -> (function, allowed argument counts)
+FUNCTIONS = {
+    "sqrt": (math.sqrt, (1,)), "exp": (math.exp, (1,)),
+    "log": (math.log, (1, 2)), "log10": (math.log10, (1,)), "log2": (math.log2, (1,)),
+    "sin": (math.sin, (1,)), "cos": (math.cos, (1,)), "tan": (math.tan, (1,)),
+    "asin": (math.asin, (1,)), "acos": (math.acos, (1,)), "atan": (math.atan, (1,)), "atan2": (math.atan2, (2,)),
+    "sinh": (math.sinh, (1,)), "cosh": (math.cosh, (1,)), "tanh": (math.tanh, (1,)),
+    "degrees": (math.degrees, (1,)), "radians": (math.radians, (1,)), "hypot": (math.hypot, (2,)),
+    "abs": (abs, (1,)), "floor": (math.floor, (1,)), "ceil": (math.ceil, (1,)), "round": (_safe_round, (1, 2)),
+}
+CONSTANTS = {"pi": math.pi, "e": math.e, "tau": math.tau}
+
+# Plan opcodes
+PUSH, LOAD, UNARY, BINARY, CALL = range(5)
+
+
+class Plan:
+    """A validated, flattened (postfix) evaluation plan for one expression."""
+
+    __slots__ = ("expression", "instructions", "variables")
+
+    def __init__(self, expression, instructions, variables):
+        self.expression = expression
+        self.instructions = tuple(instructions)
+        self.variables = tuple(variables)
+
+    def evaluate(self, bindings=None):
+        """Evaluates the plan with scalar variable bindings. Raises CalculatorError."""
+        bindings = bindings or {}
+        stack = []
+        push, pop = stack.append, stack.pop
+        try:
+            for opcode, arg in self.instructions:
+                if opcode == PUSH:
+                    push(arg)
+                elif opcode == LOAD:
+                    if arg not in bindings:
+                        raise CalculatorError(f"Unknown name '{arg}'.")
+                    push(_check_magnitude(bindings[arg]))
+                elif opcode == BINARY:
+                    right = pop()
+                    push(_check_magnitude(arg(pop(), right)))
+                elif opcode == UNARY:
+                    push(arg(pop()))
+                else:
+                    function, argc = arg
+                    args = stack[-argc:]
+                    del stack[-argc:]
+                    push(_check_magnitude(function(*args)))
+        except ZeroDivisionError:
+            raise CalculatorError("Division by zero.") from None
+        except (OverflowError, ValueError, TypeError) as e:
+            if isinstance(e, CalculatorError):
+                raise
+            raise CalculatorError(str(e)) from None
+        return stack[0]
+
+    def evaluate_many(self, bindings):
+        """
+        Evaluates the plan once per row of `bindings`, a mapping of variable name to a
+        sequence of values (all the same length). Returns a list of results; rows that
+        fail (division by zero, limits, domain errors) evaluate to nan.
+        """
+        missing = [name for name in self.variables if name not in bindings]
+        if missing:
+            raise CalculatorError(f"Unknown name '{missing[0]}'.")
+        lengths = {len(bindings[name]) for name in self.variables}
+        if len(lengths) > 1:
+            raise CalculatorError("All binding arrays must have the same length.")
+        rows = lengths.pop() if lengths else 1
+
+        # Each stack entry is a column: a list with one value per row.
+        stack = []
+        for opcode, arg in self.instructions:
+            if opcode == PUSH:
+                stack.append([arg] * rows)
+            elif opcode == LOAD:
+                column = list(bindings[arg])
+                stack.append(column if _within_limits(column) else [_row(_check_magnitude, v) for v in column])
+            elif opcode == BINARY:
+                right = stack.pop()
+                stack.append(_apply_binary(arg, stack.pop(), right))
+            elif opcode == UNARY:
+                stack.append(_apply(arg, [stack.pop()]))
+            else:
+                function, argc = arg
+                columns = stack[-argc:]
+                del stack[-argc:]
+                stack.append(_apply(function, columns))
+        return stack[0]
+
+
+def _within_limits(column) -> bool:
+    """True if every value is a real number within the magnitude limit (nan fails the comparison)."""
+    try:
+        return all(-MAX_MAGNITUDE <= value <= MAX_MAGNITUDE for value in column)
+    except TypeError:  # complex
+        return False
+
+
+def _apply_binary(function, left, right):
+    # Whole column in one tight loop; only columns with a failing row pay for per-row handling.
+    try:
+        result = [function(a, b) for a, b in zip(left, right)]
+        if _within_limits(result):
+            return result
+    except (ArithmeticError, ValueError, TypeError):
+        pass
+    return [_row(function, a, b) for a, b in zip(left, right)]
+
+
+def _apply(function, columns):
+    try:
+        result = [function(*args) for args in zip(*columns)]
+        if _within_limits(result):
+            return result
+    except (ArithmeticError, ValueError, TypeError):
+        pass
+    return [_row(function, *args) for args in zip(*columns)]
+
+
+def _row(function, *args):
+    """Applies one operation to one row, propagating nan and turning failures into nan."""
+    for value in args:
+        if value != value:
+            return math.nan
+    try:
+        return _check_magnitude(function(*args))
+    except (ArithmeticError, ValueError, TypeError):
+        return math.nan
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def compile_expression(expression: str) -> Plan:
+    """Parses, validates and flattens an expression. Memoized; raises CalculatorError."""
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise CalculatorError(f"Expression is longer than {MAX_EXPRESSION_LENGTH} characters.")
+    try:
+        tree = ast.parse(expression.strip(), mode="eval").body
+    except (SyntaxError, ValueError, RecursionError, MemoryError) as e:
+        raise CalculatorError(f"Invalid expression: {e}") from None
+
+    # Iterative post-order walk: children are emitted before their operator.
+    instructions = []
+    variables = []
+    nodes = 0
+    work = [(tree, False)]
+    while work:
+        node, children_done = work.pop()
+        if not children_done:
+            nodes += 1
+            if nodes > MAX_NODES:
+                raise CalculatorError(f"Expression has more than {MAX_NODES} nodes.")
+            work.append((node, True))
+            for child in reversed(_children(node)):
+                work.append((child, False))
+            continue
+        instructions.append(_instruction(node, variables))
+    return Plan(expression, instructions, variables)
+
+
+def _children(node) -> list:
+    if isinstance(node, ast.BinOp):
+        return [node.left, node.right]
+    if isinstance(node, ast.UnaryOp):
+        return [node.operand]
+    if isinstance(node, ast.Call):
+        return list(node.args)
+    return []
+
+
+def _instruction(node, variables):
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise CalculatorError(f"Unsupported literal {node.value!r}.")
+        return PUSH, _check_magnitude(node.value)
+    if isinstance(node, ast.BinOp):
+        operator = BINARY_OPERATORS.get(type(node.op))
+        if operator is None:
+            raise CalculatorError(f"Unsupported operator {type(node.op).__name__}.")
+        return BINARY, operator
+    if isinstance(node, ast.UnaryOp):
+        operator = UNARY_OPERATORS.get(type(node.op))
+        if operator is None:
+            raise CalculatorError(f"Unsupported operator {type(node.op).__name__}.")
+        return UNARY, operator
+    if isinstance(node, ast.Call):
+        name = node.func.id if isinstance(node.func, ast.Name) else None
+        if name not in FUNCTIONS or node.keywords:
+            raise CalculatorError(f"Unsupported function {name or type(node.func).__name__}.")
+        function, arities = FUNCTIONS[name]
+        if len(node.args) not in arities:
+            raise CalculatorError(f"{name}() takes {' or '.join(map(str, arities))} argument(s).")
+        return CALL, (function, len(node.args))
+    if isinstance(node, ast.Name):
+        if node.id in CONSTANTS:
+            return PUSH, CONSTANTS[node.id]
+        if node.id in FUNCTIONS:
+            raise CalculatorError(f"Function '{node.id}' must be called.")
+        if node.id not in variables:
+            variables.append(node.id)
+        return LOAD, node.id
+    raise CalculatorError(f"Unsupported syntax {type(node).__name__}.")
+
+
+def evaluate(expression: str, bindings=None):
+    """Compiles (memoized) and evaluates an expression. Raises CalculatorError."""
+    return compile_expression(expression).evaluate(bindings)
+
+
+def evaluate_many(expression: str, bindings):
+    """Compiles (memoized) and evaluates an expression over arrays of variable bindings."""
+    return compile_expression(expression).evaluate_many(bindings)
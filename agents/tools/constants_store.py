@@ -0,0 +1,175 @@
+# multi_agent_tutor/agents/tools/constants_store.py
+"""
+Indexed store of physical constants.
+
+The bundled CODATA table (data/codata_2018.json) is loaded once into a ConstantsIndex
+that precomputes every lookup path: normalized names and aliases, case-sensitive
+symbols ("G" is not "g"), and a trigram index for typo-tolerant fuzzy matching.
+Lookups return typed PhysicalConstant records; callers that need JSON (the model's
+function response) serialize them with `to_dict()` at the boundary.
+"""
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "codata_2018.json")
+FUZZY_THRESHOLD = 0.6  # minimum trigram Jaccard similarity for a fuzzy match
+# A word match must cover more than this share of a key's significant (non-filler) words,
+# so "mass" does not pick "muon mass" nor "time" "planck time".
+WORD_COVERAGE = 0.5
+FILLER_WORDS = frozenset({"a", "an", "the", "of", "in", "constant", "s"})
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+@dataclass(frozen=True)
+class PhysicalConstant:
+    name: str
+    symbol: str
+    value: float
+    unit: str
+    uncertainty: float = 0.0
+    aliases: Tuple[str, ...] = field(default=(), compare=False)
+
+    @property
+    def exact(self) -> bool:
+        """True for constants that are exact by definition in the SI (uncertainty 0)."""
+        return self.uncertainty == 0
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "symbol": self.symbol, "value": self.value, "unit": self.unit,
+                "uncertainty": self.uncertainty, "exact": self.exact}
+
+
+def normalize(name: str) -> str:
+    """Lower-cases and collapses separators, so 'Planck_Constant ' matches 'planck constant'."""
+    return " ".join(_NON_WORD.sub(" ", name.lower().replace("'", "")).split())
+
+
+def _trigrams(text: str) -> frozenset:
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class ConstantsIndex:
+    """Precomputed lookup tables over a fixed set of constants."""
+
+    def __init__(self, constants):
+        self.constants = tuple(constants)
+        self._by_name: Dict[str, PhysicalConstant] = {}
+        self._by_symbol: Dict[str, PhysicalConstant] = {}
+        self._by_trigram: Dict[str, List[Tuple[str, PhysicalConstant]]] = {}
+        self._trigram_sets: Dict[str, frozenset] = {}
+        self._word_sets: Dict[str, frozenset] = {}
+        for constant in self.constants:
+            self._by_symbol.setdefault(constant.symbol, constant)
+            for key in (constant.name, *constant.aliases):
+                key = normalize(key)
+                if key in self._by_name:
+                    continue
+                self._by_name[key] = constant
+                self._word_sets[key] = frozenset(key.split()) - FILLER_WORDS
+                grams = self._trigram_sets[key] = _trigrams(key)
+                for gram in grams:
+                    self._by_trigram.setdefault(gram, []).append((key, constant))
+        # Longest keys first, so "reduced planck constant" wins over "planck constant" in text.
+        self._keys_by_length = sorted(self._by_name, key=len, reverse=True)
+
+    def __len__(self):
+        return len(self.constants)
+
+    def lookup_exact(self, name: str, symbols: bool = True) -> Optional[PhysicalConstant]:
+        """Matches a symbol (case-sensitive, if `symbols`) or a normalized name/alias; no fuzzy matching."""
+        stripped = name.strip()
+        if symbols and stripped in self._by_symbol:
+            return self._by_symbol[stripped]
+        return self._by_name.get(normalize(stripped))
+
+    def lookup(self, name: str, fuzzy: bool = True) -> Optional[PhysicalConstant]:
+        """
+        Exact symbol/name/alias match first, then a name containing every significant query
+        word and made up mostly of them (shortest wins), then, if `fuzzy`, the best trigram
+        match above FUZZY_THRESHOLD.
+        """
+        constant = self.lookup_exact(name)
+        if constant is not None:
+            return constant
+        key = normalize(name)
+        if not key:
+            return None
+        words = frozenset(key.split()) - FILLER_WORDS
+        candidates = [k for k, k_words in self._word_sets.items()
+                      if words and words <= k_words and len(words) / len(k_words) > WORD_COVERAGE]
+        if candidates:
+            return self._by_name[min(candidates, key=len)]
+        return self._fuzzy(key) if fuzzy else None
+
+    def lookup_many(self, names) -> Tuple[Dict[str, PhysicalConstant], List[str]]:
+        """Looks up several names at once. Returns ({name: constant}, [names not found])."""
+        found, missing = {}, []
+        for name in names:
+            constant = self.lookup(name)
+            if constant is None:
+                missing.append(name)
+            else:
+                found[name] = constant
+        return found, missing
+
+    def find_in_text(self, text: str) -> List[PhysicalConstant]:
+        """Constants whose name or multi-word alias appears in free text, in order of first mention."""
+        lowered = f" {normalize(text)} "
+        hits = []
+        for key in self._keys_by_length:
+            if " " not in key:
+                continue  # single words ("gravity", "c") are too ambiguous in prose
+            position = lowered.find(f" {key} ")
+            if position >= 0:
+                # Blank out the match so "planck constant" doesn't re-match inside "reduced planck constant".
+                lowered = lowered[:position + 1] + "#" * len(key) + lowered[position + 1 + len(key):]
+                hits.append((position, self._by_name[key]))
+        seen, ordered = set(), []
+        for _, constant in sorted(hits, key=lambda hit: hit[0]):
+            if constant.name not in seen:
+                seen.add(constant.name)
+                ordered.append(constant)
+        return ordered
+
+    def _fuzzy(self, key: str) -> Optional[PhysicalConstant]:
+        # Typos keep the word count; a shorter query ("electron") is not a typo of "electron mass".
+        size = len(key.split())
+        grams = _trigrams(key)
+        shared: Dict[str, int] = {}
+        owner: Dict[str, PhysicalConstant] = {}
+        for gram in grams:
+            for candidate, constant in self._by_trigram.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+                owner[candidate] = constant
+        best, best_score = None, FUZZY_THRESHOLD
+        for candidate, count in shared.items():
+            if candidate.count(" ") + 1 != size:
+                continue
+            score = count / (len(grams) + len(self._trigram_sets[candidate]) - count)
+            if score >= best_score:
+                best, best_score = candidate, score
+        return owner[best] if best is not None else None
+
+
+def load_constants(path: str = DATA_PATH) -> List[PhysicalConstant]:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return [
+        PhysicalConstant(
+            name=entry["name"], symbol=entry["symbol"], value=entry["value"], unit=entry["unit"],
+            uncertainty=entry.get("uncertainty", 0.0), aliases=tuple(entry.get("aliases", ())),
+        )
+        for entry in data["constants"]
+    ]
+
+
+@lru_cache(maxsize=None)
+def get_index(path: str = DATA_PATH) -> ConstantsIndex:
+    """The shared index over the bundled table, built on first use."""
+    return ConstantsIndex(load_constants(path))
@@ -1,36 +1,36 @@
 # multi_agent_tutor/agents/tools/physics_constants.py
-import json
+from typing import List
+from .constants_store import get_index
 
-CONSTANTS = {
-    "speed of light": {"value": 299792458, "unit": "m/s", "symbol": "c"},
-    "gravitational constant": {"value": 6.67430e-11, "unit": "N(m/kg)^2", "symbol": "G"},
-    "planck constant": {"value": 6.62607015e-34, "unit": "Js", "symbol": "h"},
-    "boltzmann constant": {"value": 1.380649e-23, "unit": "J/K", "symbol": "k"},
-    "electron mass": {"value": 9.1093837015e-31, "unit": "kg", "symbol": "m_e"},
-    "proton mass": {"value": 1.67262192369e-27, "unit": "kg", "symbol": "m_p"},
-    "elementary charge": {"value": 1.602176634e-19, "unit": "C", "symbol": "e"}
-}
-
-def get_physics_constant(constant_name: str) -> str:
+def get_physics_constant(constant_name: str) -> dict:
     """
-    Looks up a physical constant from a predefined dictionary.
-    Returns the constant's value, unit, and symbol as a JSON string or a descriptive string if not found.
+    Looks up a physical constant (CODATA 2018) by name, symbol or common alias, e.g.
+    "speed of light", "c", "G", "gravity" or "planck constant". Small typos are tolerated.
+    Returns the constant's name, symbol, value, unit and uncertainty, or an error if not found.
     """
-    query_name = constant_name.lower().strip().replace("_", " ") # Normalize input
-
-    if query_name in CONSTANTS:
-        return json.dumps(CONSTANTS[query_name])
-
-    # Try partial matching or synonyms
-    for key, val_dict in CONSTANTS.items():
-        if query_name in key:
-            return json.dumps(val_dict)
+    constant = get_index().lookup(constant_name)
+    if constant is None:
+        return {"error": f"Constant '{constant_name}' not found."}
+    return constant.to_dict()
 
-    return json.dumps({"error": f"Constant '{constant_name}' not found."})
+def get_physics_constants(constant_names: List[str]) -> dict:
+    """
+    Looks up several physical constants in one call; use it when a problem needs more than one.
+    Accepts names, symbols or common aliases, e.g. ["c", "planck constant", "electron mass"].
+    Returns the found constants and the names that were not found.
+    """
+    found, missing = get_index().lookup_many(list(constant_names))
+    return {
+        "constants": [dict(constant.to_dict(), query=name) for name, constant in found.items()],
+        "not_found": missing,
+    }
 
 # Example Usage (for testing)
 if __name__ == "__main__":
     print(get_physics_constant("speed of light"))
     print(get_physics_constant("gravity"))
+    print(get_physics_constant("G"))
     print(get_physics_constant("Boltzmann Constant"))
-    print(get_physics_constant("unknown_constant"))
\ No newline at end of file
+    print(get_physics_constant("plank constant"))
+    print(get_physics_constant("unknown_constant"))
+    print(get_physics_constants(["c", "h", "electron mass", "unobtainium"]))
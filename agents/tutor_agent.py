@@ -1,100 +1,354 @@
 # multi_agent_tutor/agents/tutor_agent.py
 from .base_agent import BaseAgent
+from .llm_backend import get_backend
 from .math_agent import MathAgent
 from .physics_agent import PhysicsAgent
-import google.generativeai as genai # For direct model call if needed for classifier
-from config import DEFAULT_GEMINI_MODEL # To use consistent model for classifier
+from .router import KeywordRouter
+from .fast_path import try_fast_path
+from .tools.constants_store import get_index
+from .prompts import (
+    CLASSIFIER_PROMPT_TEMPLATE, BATCH_CLASSIFIER_PROMPT_TEMPLATE, CLASSIFIER_MAX_OUTPUT_TOKENS,
+    BATCH_CLASSIFIER_MAX_OUTPUT_TOKENS_PER_QUERY, GENERAL_SYSTEM_INSTRUCTION, PROMPT_VERSION,
+)
+from .upstream import upstream_gate, read_stream
+import asyncio
+from functools import cached_property
+import random
+import re
+import time
+from config import (
+    DEFAULT_GEMINI_MODEL, ROUTER_CONFIDENCE_THRESHOLD, ROUTER_SHADOW_SAMPLE_RATE, BATCH_MAX_CONCURRENCY,
+    REQUEST_TIMEOUT_SECONDS, CLASSIFIER_TIMEOUT_SECONDS, AGENT_MAX_OUTPUT_TOKENS, REQUEST_TOKEN_BUDGET,
+)
+from deadlines import deadline_after, deadline_at
+from metrics import ROUTING_DECISIONS, ROUTING_LATENCY, ROUTING_AGREEMENT, FAST_PATH_ANSWERS, STAGE_LATENCY, REQUEST_TOKENS
+from structured_logging import get_logger
+from token_usage import track_usage, record_usage
+from tracing import span, NOOP_SPAN
+
+logger = get_logger("agents")
+
+BATCH_CLASSIFICATION_LINE = re.compile(r"(\d+)\s*[:.)-]\s*'?(math|physics|general)", re.IGNORECASE)
 
 class TutorAgent(BaseAgent):
     def __init__(self):
-        super().__init__(system_instruction=None) # Tutor agent itself might not need a system instruction for its core routing logic
-        self.math_agent = MathAgent()
-        self.physics_agent = PhysicsAgent()
+        # The routing logic needs no system instruction; the tutor's own model answers general queries.
+        super().__init__(system_instruction=GENERAL_SYSTEM_INSTRUCTION)
         self.name = "Tutor Agent"
-        # Initialize a separate model instance for classification if preferred, or use the base one carefully.
-        # Using a specific model for classification can be more reliable.
-        self.classifier_model = genai.GenerativeModel(DEFAULT_GEMINI_MODEL)
+        self.router = KeywordRouter()
+        self._shadow_tasks = set()
 
+    # Specialists are built on first use (or by warm_up), keeping app import and worker boot cheap.
+    @cached_property
+    def math_agent(self) -> MathAgent:
+        return MathAgent()
 
-    def classify_intent_with_llm(self, query: str) -> str:
-        """Classifies query to 'math', 'physics', or 'general' using LLM."""
-        prompt = f"""
-        Analyze the following student query and classify its primary subject focus.
-        Return ONLY one of the following category names: 'math', 'physics', or 'general'.
+    @cached_property
+    def physics_agent(self) -> PhysicsAgent:
+        return PhysicsAgent()
 
-        Student Query: "{query}"
+    @property
+    def prompt_version(self) -> str:
+        """Short hash of every prompt that shapes an answer; cached answers are keyed on it."""
+        return PROMPT_VERSION
+
+    async def warm_up(self):
+        """
+        Builds the LLM backend (importing and configuring its SDK), the constants index, the
+        specialist agents and their models, and opens the provider connection, so the first
+        request pays for none of it.
+        """
+        backend = await asyncio.to_thread(get_backend)
+        await asyncio.to_thread(get_index)
+        specs = [agent.model_spec() for agent in (self, self.math_agent, self.physics_agent)]
+        if upstream_gate.fallback_model:
+            specs += [(upstream_gate.fallback_model, *spec[1:]) for spec in specs]
+        await backend.warm_up(list(dict.fromkeys(specs)))
 
-        Category:
+    async def classify_intent(self, query: str) -> str:
         """
+        Classifies query to 'math', 'physics', or 'general'.
+        The local keyword router decides confident queries; only the rest pay an LLM round trip.
+        """
+        with span("classify_intent") as classify_span:
+            start = time.perf_counter()
+            local_subject, confidence = self.router.classify(query)
+            ROUTING_LATENCY.observe(time.perf_counter() - start, source="local")
+            classify_span.set(local_subject=local_subject, confidence=round(confidence, 3))
+
+            if confidence >= ROUTER_CONFIDENCE_THRESHOLD:
+                ROUTING_DECISIONS.inc(source="local", subject=local_subject)
+                classify_span.set(source="local", subject=local_subject)
+                if ROUTER_SHADOW_SAMPLE_RATE > 0 and random.random() < ROUTER_SHADOW_SAMPLE_RATE:
+                    task = asyncio.create_task(self._shadow_classify(query, local_subject))
+                    self._shadow_tasks.add(task)
+                    task.add_done_callback(self._shadow_tasks.discard)
+                return local_subject
+
+            start = time.perf_counter()
+            subject = await self.classify_intent_with_llm(query)
+            ROUTING_LATENCY.observe(time.perf_counter() - start, source="llm")
+            ROUTING_DECISIONS.inc(source="llm", subject=subject)
+            classify_span.set(source="llm", subject=subject)
+            if confidence > 0:
+                ROUTING_AGREEMENT.inc(result="agree" if subject == local_subject else "disagree", band="low_confidence")
+            return subject
+
+    async def _shadow_classify(self, query: str, local_subject: str):
+        """Labels a locally routed query with the LLM to track the local router's accuracy."""
+        subject = await self.classify_intent_with_llm(query)
+        ROUTING_AGREEMENT.inc(result="agree" if subject == local_subject else "disagree", band="high_confidence")
+
+
+    async def classify_intent_with_llm(self, query: str) -> str:
+        """Classifies query to 'math', 'physics', or 'general' using LLM."""
+        prompt = CLASSIFIER_PROMPT_TEMPLATE.format(query=query)
+        contents = self._build_contents([prompt], None)
         response_text = "general" # Default
         try:
-            response = self.classifier_model.generate_content(prompt) # Direct call for classification
+            # Classification uses the plain model (no system instruction or tools).
+            with span("classify_intent_with_llm") as llm_span:
+                # Idempotent and short, so a slow classification is hedged rather than waited out.
+                response = await upstream_gate.call(
+                    lambda model: self.backend.generate(model, contents, max_output_tokens=CLASSIFIER_MAX_OUTPUT_TOKENS),
+                    contents, call_site="classifier",
+                    model_name=DEFAULT_GEMINI_MODEL, timeout=CLASSIFIER_TIMEOUT_SECONDS, hedge=True,
+                ) # Direct call for classification
+                llm_span.set(prompt_tokens=response.prompt_tokens, output_tokens=response.output_tokens)
             response_text = response.text.strip().lower()
         except Exception as e:
-            print(f"[{self.name} Classifier] Error during LLM call: {e}")
-            # Fallback to keyword matching or default if LLM fails
-            query_lower = query.lower()
-            if any(kw in query_lower for kw in ["math", "algebra", "calculate", "equation", "solve", "number", "geometry", "integral", "derivative"]):
-                return "math"
-            if any(kw in query_lower for kw in ["physics", "force", "energy", "motion", "gravity", "light", "thermodynamics", "relativity", "quantum"]):
-                return "physics"
-            return "general"
+            logger.warning("Classifier LLM call failed; using the local router", extra={"agent": self.name, "error": str(e)})
+            # Fallback to the local keyword router if LLM fails
+            return self.router.classify(query)[0]
 
 
-        print(f"[{self.name} Classifier] Raw classification: '{response_text}' for query: '{query}'")
+        logger.debug("Raw classification", extra={"agent": self.name, "classification": response_text, "query": query})
 
         if "math" in response_text:
             return "math"
         elif "physics" in response_text:
             return "physics"
         else:
-            # If LLM returns something unexpected, try basic keyword check as a fallback
-            query_lower = query.lower()
-            if any(kw in query_lower for kw in ["math", "algebra", "calculate", "equation", "solve", "number", "geometry", "integral", "derivative"]):
-                return "math"
-            if any(kw in query_lower for kw in ["physics", "force", "energy", "motion", "gravity", "light", "thermodynamics", "relativity", "quantum"]):
-                return "physics"
-            return "general"
+            # If LLM returns something unexpected, fall back to the local keyword router
+            return self.router.classify(query)[0]
+
+    async def classify_intents(self, queries) -> list:
+        """
+        Classifies several queries at once. Confident queries are routed locally; the rest
+        share a single LLM classifier call instead of one round trip each.
+        """
+        with span("classify_intents", size=len(queries)) as classify_span:
+            subjects = []
+            uncertain = []  # indexes of queries the local router is unsure about
+            for i, query in enumerate(queries):
+                start = time.perf_counter()
+                local_subject, confidence = self.router.classify(query)
+                ROUTING_LATENCY.observe(time.perf_counter() - start, source="local")
+                subjects.append(local_subject)
+                if confidence >= ROUTER_CONFIDENCE_THRESHOLD:
+                    ROUTING_DECISIONS.inc(source="local", subject=local_subject)
+                else:
+                    uncertain.append(i)
+            classify_span.set(local=len(queries) - len(uncertain), llm=len(uncertain))
+            if not uncertain:
+                return subjects
+
+            start = time.perf_counter()
+            if len(uncertain) == 1:
+                llm_subjects = [await self.classify_intent_with_llm(queries[uncertain[0]])]
+            else:
+                llm_subjects = await self.classify_intents_with_llm([queries[i] for i in uncertain])
+            ROUTING_LATENCY.observe(time.perf_counter() - start, source="llm")
+            for i, subject in zip(uncertain, llm_subjects):
+                ROUTING_DECISIONS.inc(source="llm", subject=subject)
+                subjects[i] = subject
+            return subjects
+
+    async def classify_intents_with_llm(self, queries) -> list:
+        """
+        Classifies several queries with one LLM call. Queries missing from the reply (or all
+        of them, if the call fails) fall back to the local keyword router.
+        """
+        numbered = "\n".join(f"{n}. \"{query}\"" for n, query in enumerate(queries, start=1))
+        contents = self._build_contents([BATCH_CLASSIFIER_PROMPT_TEMPLATE.format(queries=numbered)], None)
+        labels = {}
+        try:
+            with span("classify_intents_with_llm", size=len(queries)) as llm_span:
+                max_output_tokens = BATCH_CLASSIFIER_MAX_OUTPUT_TOKENS_PER_QUERY * len(queries)
+                response = await upstream_gate.call(
+                    lambda model: self.backend.generate(model, contents, max_output_tokens=max_output_tokens),
+                    contents, call_site="classifier",
+                    model_name=DEFAULT_GEMINI_MODEL, timeout=CLASSIFIER_TIMEOUT_SECONDS, hedge=True,
+                )
+                llm_span.set(prompt_tokens=response.prompt_tokens, output_tokens=response.output_tokens)
+            for number, label in BATCH_CLASSIFICATION_LINE.findall(response.text):
+                labels[int(number)] = label.lower()
+        except Exception as e:
+            logger.warning("Batch classifier LLM call failed; using the local router", extra={"agent": self.name, "error": str(e)})
+        if len(labels) < len(queries):
+            logger.debug("Batch classification incomplete", extra={"agent": self.name, "classified": len(labels), "size": len(queries)})
+        return [labels.get(n) or self.router.classify(query)[0] for n, query in enumerate(queries, start=1)]
 
-    def route_query(self, query: str) -> str:
-        print(f"[{self.name}] Received query for routing: {query}")
+    async def route_query(self, query: str, history=None, timeout: float = REQUEST_TIMEOUT_SECONDS) -> str:
+        """
+        Answers a query, optionally in the context of a session's conversation history
+        (a list of role/parts dicts). The agents are shared, so history is always passed in, never stored.
+        Every model call made for the answer shares the `timeout` budget; running out raises DeadlineExceeded.
+        """
+        logger.debug("Received query for routing", extra={"agent": self.name, "query": query})
 
-        self.math_agent.clear_history()
-        self.physics_agent.clear_history()
-        # self.clear_history() # Tutor agent's own history might be useful for long convos
+        with deadline_after(timeout), track_usage(REQUEST_TOKEN_BUDGET) as usage, \
+                span("route_query", history_turns=len(history or ())) as route_span:
+            fast_answer = self._answer_fast_path(query)
+            if fast_answer is not None:
+                route_span.set(subject="fast_path")
+                return fast_answer
 
-        subject = self.classify_intent_with_llm(query)
-        print(f"[{self.name}] Classified query as: {subject}")
+            with STAGE_LATENCY.time(stage="classification", agent=self.name):
+                subject = await self.classify_intent(query)
+            logger.debug("Classified query", extra={"agent": self.name, "subject": subject})
+            route_span.set(subject=subject)
 
-        response = ""
+            response = await self._answer_for_subject(query, subject, history)
+            self._report_usage(usage, route_span)
+        logger.info("Answered query", extra={"agent": self.name, "subject": subject, "tokens": usage.as_dict(),
+                                             "payload": response, "verbose": True})
+        return response
+
+    async def route_batch(self, queries, max_concurrency=BATCH_MAX_CONCURRENCY, timeout: float = REQUEST_TIMEOUT_SECONDS) -> list:
+        """
+        Answers independent queries (no session history) together: fast-path answers first,
+        one shared classification for the rest, then every query's agent call runs concurrently,
+        at most max_concurrency at a time, all within one `timeout` budget.
+        Returns (subject, answer) per query in input order; answer is the exception if that query failed.
+        """
+        with deadline_after(timeout), span("route_batch", size=len(queries)) as batch_span:
+            subjects = [None] * len(queries)
+            answers = [None] * len(queries)
+            pending = []
+            for i, query in enumerate(queries):
+                fast_answer = self._answer_fast_path(query)
+                if fast_answer is None:
+                    pending.append(i)
+                else:
+                    subjects[i], answers[i] = "fast_path", fast_answer
+
+            if pending:
+                with STAGE_LATENCY.time(stage="classification", agent=self.name):
+                    for i, subject in zip(pending, await self.classify_intents([queries[i] for i in pending])):
+                        subjects[i] = subject
+
+            # Grouped by subject so each specialist's calls are scheduled together.
+            groups = {}
+            for i in pending:
+                groups.setdefault(subjects[i], []).append(i)
+            batch_span.set(fast_path=len(queries) - len(pending), **{f"subject.{s}": len(g) for s, g in groups.items()})
+
+            semaphore = asyncio.Semaphore(max_concurrency)
+
+            async def answer(i):
+                async with semaphore:
+                    # Each item is its own answer, with its own token budget; the shared classification is not counted.
+                    with track_usage(REQUEST_TOKEN_BUDGET) as usage:
+                        try:
+                            answers[i] = await self._answer_for_subject(queries[i], subjects[i])
+                            self._report_usage(usage)
+                        except Exception as e:
+                            answers[i] = e
+
+            await asyncio.gather(*(answer(i) for group in groups.values() for i in group))
+        return list(zip(subjects, answers))
+
+    async def _answer_for_subject(self, query: str, subject: str, history=None) -> str:
         if subject == "math":
-            response = self.math_agent.handle_query(query)
+            return await self.math_agent.handle_query(query, history)
+        if subject == "physics":
+            return await self.physics_agent.handle_query(query, history)
+        # Prior turns of the session give the general answer its conversational context
+        contents = self._build_contents([query], history)
+        with STAGE_LATENCY.time(stage="first_generation", agent=self.name), \
+                span("general_generation") as generation_span:
+            general_response = await upstream_gate.call(
+                lambda model: self.backend.generate(model, contents, system_instruction=self.system_instruction,
+                                                    max_output_tokens=AGENT_MAX_OUTPUT_TOKENS),
+                contents, call_site="general", model_name=self.model_name,
+            )
+            generation_span.set(prompt_tokens=general_response.prompt_tokens,
+                                output_tokens=general_response.output_tokens)
+        return general_response.text
+
+    async def route_query_stream(self, query: str, history=None, timeout=REQUEST_TIMEOUT_SECONDS):
+        """
+        Routes like route_query, but yields the answer's text chunks as the final generation step produces them.
+        The whole stream must finish within `timeout` seconds. A contextvar set across a yield would leak
+        into the consumer, so the absolute deadline is passed down explicitly: each model call and each
+        chunk is bounded by it, and DeadlineExceeded is raised once it passes.
+        """
+        logger.debug("Received query for streaming", extra={"agent": self.name, "query": query})
+        deadline = time.monotonic() + timeout
+
+        fast_answer = self._answer_fast_path(query)
+        if fast_answer is not None:
+            yield fast_answer
+            return
+
+        with deadline_at(deadline), STAGE_LATENCY.time(stage="classification", agent=self.name):
+            subject = await self.classify_intent(query)
+        logger.debug("Classified query", extra={"agent": self.name, "subject": subject})
+
+        if subject == "math":
+            chunks = self.math_agent.handle_query_stream(query, history, deadline)
         elif subject == "physics":
-            response = self.physics_agent.handle_query(query)
+            chunks = self.physics_agent.handle_query_stream(query, history, deadline)
         else:
-            print(f"[{self.name}] Handling as general query.")
-            general_prompt = (
-                "You are a helpful general knowledge Tutor Agent. "
-                "The query could not be specifically classified as math or physics, or it's a general question. "
-                f"Please answer the following student query to the best of your ability: \"{query}\""
-            )
-            # Use the base class's generate_response for the TutorAgent itself
-            # Ensure Tutor Agent uses its own context if it's conversational
-            # For a simple non-conversational Tutor Agent general response:
-            temp_model = genai.GenerativeModel(DEFAULT_GEMINI_MODEL) # Fresh model for general query
-            response = temp_model.generate_content(general_prompt).text
-        return response
+            contents = self._build_contents([query], history)
+            stage_start = time.perf_counter()
+            with deadline_at(deadline):
+                stream = await upstream_gate.call(
+                    lambda model: self.backend.stream(model, contents, system_instruction=self.system_instruction,
+                                                      max_output_tokens=AGENT_MAX_OUTPUT_TOKENS),
+                    contents, call_site="general", model_name=self.model_name,
+                )
+            try:
+                async for chunk in read_stream(stream, deadline, "general"):
+                    yield chunk
+            finally:
+                await stream.aclose()
+            STAGE_LATENCY.observe(time.perf_counter() - stage_start, stage="first_generation", agent=self.name)
+            record_usage("general", stream.response)
+            return
+        async for chunk in chunks:
+            yield chunk
+
+    @staticmethod
+    def _report_usage(usage, route_span=NOOP_SPAN):
+        """Records what one answer spent across all of its model calls."""
+        REQUEST_TOKENS.observe(usage.prompt_tokens, kind="prompt")
+        REQUEST_TOKENS.observe(usage.output_tokens, kind="output")
+        route_span.set(prompt_tokens=usage.prompt_tokens, output_tokens=usage.output_tokens)
+
+    def _answer_fast_path(self, query: str):
+        fast_answer = try_fast_path(query)
+        if fast_answer is None:
+            return None
+        kind, answer = fast_answer
+        FAST_PATH_ANSWERS.inc(kind=kind)
+        logger.debug("Answered query on the fast path", extra={"agent": self.name, "kind": kind})
+        return answer
+
+async def _demo():
+    tutor = TutorAgent()
+    print("\n--- Testing Math Query ---")
+    print(f"Tutor Response: {await tutor.route_query('Can you help me solve 2x + 5 = 11? And also, what is 10 times 3?')}")
+    # ... (other print statements for testing) ...
+    print("\n--- Testing Physics Query ---")
+    physics_query_text = "What is Newton's second law and the value of the gravitational constant G?"
+    print(f"Tutor Response: {await tutor.route_query(physics_query_text)}")
+    # ... (other print statements for testing) ...
 
 if __name__ == "__main__":
     try:
-        tutor = TutorAgent()
-        print("\n--- Testing Math Query ---")
-        print(f"Tutor Response: {tutor.route_query('Can you help me solve 2x + 5 = 11? And also, what is 10 times 3?')}")
-        # ... (other print statements for testing) ...
-        print("\n--- Testing Physics Query ---")
-        physics_query_text = "What is Newton's second law and the value of the gravitational constant G?"
-        print(f"Tutor Response: {tutor.route_query(physics_query_text)}")
-        # ... (other print statements for testing) ...
+        asyncio.run(_demo())
     except Exception as e:
         print(f"Error in TutorAgent test: {e}")
         print("Ensure GEMINI_API_KEY is set in .env")
\ No newline at end of file
@@ -0,0 +1,371 @@
+# multi_agent_tutor/agents/upstream.py
+"""
+Central gate for every LLM call: a max-in-flight semaphore, token buckets for
+requests and tokens per minute, a bounded wait queue that sheds load, and retries
+with jittered backoff for retryable errors only.
+
+Quota errors shrink the request rate adaptively; successes grow it back to the
+configured limit.
+
+Tail latency: each attempt is limited to its stage timeout, shortened to what is left
+of the request deadline (see deadlines.py). Retries after a failure or timeout go to
+FALLBACK_GEMINI_MODEL. Idempotent short calls (hedge=True) send a duplicate to the
+fallback model once the first has run longer than the call site's recent p95 latency,
+and take whichever answers first.
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from config import (
+    DEFAULT_GEMINI_MODEL,
+    FALLBACK_GEMINI_MODEL,
+    UPSTREAM_MAX_IN_FLIGHT,
+    UPSTREAM_REQUESTS_PER_MINUTE,
+    UPSTREAM_TOKENS_PER_MINUTE,
+    UPSTREAM_MAX_QUEUE,
+    UPSTREAM_MAX_WAIT_SECONDS,
+    UPSTREAM_MAX_RETRIES,
+    UPSTREAM_BACKOFF_BASE_SECONDS,
+    UPSTREAM_CALL_TIMEOUT_SECONDS,
+    UPSTREAM_HEDGE_ENABLED,
+    UPSTREAM_HEDGE_QUANTILE,
+    UPSTREAM_HEDGE_MIN_SAMPLES,
+    UPSTREAM_HEDGE_DEFAULT_DELAY_SECONDS,
+)
+from deadlines import bounded, remaining
+from metrics import (
+    UPSTREAM_IN_FLIGHT, UPSTREAM_WAIT, UPSTREAM_REJECTIONS, UPSTREAM_RETRIES, UPSTREAM_ERRORS, UPSTREAM_CALLS,
+    UPSTREAM_TIMEOUTS, UPSTREAM_HEDGES, UPSTREAM_FALLBACKS, DEADLINES_EXCEEDED,
+)
+from token_usage import record_usage
+from tracing import span
+from .llm_backend import LLMResponse, LLMStream, QuotaExceeded, TransientUpstreamError
+
+# Backends translate provider errors into these, so the gate stays provider-agnostic.
+QUOTA_ERRORS = (QuotaExceeded,)
+RETRYABLE_ERRORS = QUOTA_ERRORS + (TransientUpstreamError,)
+
+MAX_BACKOFF_SECONDS = 8.0
+# Adaptive rate: multiplicative decrease on quota errors, additive increase on success.
+RATE_DECREASE_FACTOR = 0.7
+RATE_INCREASE_FRACTION = 0.02
+MIN_RATE_FRACTION = 0.1
+LATENCY_WINDOW_SIZE = 200  # recent successful calls per call site used for the hedge delay
+
+
+class UpstreamOverloaded(Exception):
+    """Raised when a call is shed or the upstream stays unavailable; maps to HTTP 429/503 with Retry-After."""
+
+    def __init__(self, message: str, retry_after: float, status_code: int = 503):
+        super().__init__(message)
+        self.retry_after = max(1.0, retry_after)
+        self.status_code = status_code
+
+
+class DeadlineExceeded(UpstreamOverloaded):
+    """Raised when the request's deadline passes before its model calls finish; maps to HTTP 504."""
+
+    def __init__(self, message: str = "The answer took too long; try again shortly."):
+        super().__init__(message, retry_after=1.0, status_code=504)
+
+
+def estimate_tokens(contents) -> int:
+    """Rough prompt-size estimate (~4 characters per token) used to debit the token bucket up front."""
+    if isinstance(contents, str):
+        return len(contents) // 4 + 1
+    if isinstance(contents, dict):
+        return sum(estimate_tokens(part) for part in contents.get("parts", ()))
+    if isinstance(contents, (list, tuple)):
+        return sum(estimate_tokens(item) for item in contents)
+    return 1
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0  # refill per second
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available (0 if available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= amount  # may go negative when actual usage exceeds the estimate
+
+
+class LatencyWindow:
+    """Latencies of the most recent successful calls at one call site."""
+
+    def __init__(self, size: int = LATENCY_WINDOW_SIZE):
+        self._samples = deque(maxlen=size)
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+
+    def quantile(self, q: float, min_samples: int, default: float) -> float:
+        if len(self._samples) < max(1, min_samples):
+            return default
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class UpstreamGate:
+    def __init__(self, max_in_flight=UPSTREAM_MAX_IN_FLIGHT, requests_per_minute=UPSTREAM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute=UPSTREAM_TOKENS_PER_MINUTE, max_queue=UPSTREAM_MAX_QUEUE,
+                 max_wait_seconds=UPSTREAM_MAX_WAIT_SECONDS, max_retries=UPSTREAM_MAX_RETRIES,
+                 backoff_base_seconds=UPSTREAM_BACKOFF_BASE_SECONDS, fallback_model=FALLBACK_GEMINI_MODEL,
+                 hedge_enabled=UPSTREAM_HEDGE_ENABLED):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.fallback_model = fallback_model
+        self.hedge_enabled = hedge_enabled
+        self.configured_rpm = float(requests_per_minute)
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._semaphore = None  # created lazily inside the serving event loop
+        self._waiting = 0
+        self._in_flight = 0
+        self._latencies = {}  # call site -> LatencyWindow
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    async def call(self, coroutine_fn, contents=None, call_site="agent", model_name=DEFAULT_GEMINI_MODEL,
+                   timeout=UPSTREAM_CALL_TIMEOUT_SECONDS, hedge=False):
+        """
+        Runs coroutine_fn(model) (one LLM backend call) under the gate, retrying retryable errors and
+        timeouts. The first attempt uses `model_name`; retries use the fallback model. Each attempt is
+        limited to `timeout`, shortened to the request deadline. Pass hedge=True only for idempotent calls;
+        attempts already on the fallback model are not hedged.
+        Raises UpstreamOverloaded when the call is shed or retries are exhausted, and its subclass
+        DeadlineExceeded when the request deadline passes.
+        """
+        estimated_tokens = estimate_tokens(contents) if contents is not None else 1
+        fallback_model = self.fallback_model or model_name
+        attempt = 0
+        while True:
+            attempt_model = model_name if attempt == 0 else fallback_model
+            if attempt_model != model_name:
+                UPSTREAM_FALLBACKS.inc(call_site=call_site)
+            # A retry already runs on the fallback model; hedging it would only duplicate the call.
+            hedged = hedge and self.hedge_enabled and not (self.fallback_model and attempt_model == self.fallback_model)
+            try:
+                if hedged:
+                    return await self._hedged_attempt(coroutine_fn, attempt_model, fallback_model, estimated_tokens,
+                                                      call_site, timeout, attempt)
+                return await self._attempt(coroutine_fn, attempt_model, estimated_tokens, call_site, timeout, attempt)
+            except DeadlineExceeded:
+                DEADLINES_EXCEEDED.inc(call_site=call_site)
+                raise
+            except RETRYABLE_ERRORS as failure:
+                error = type(failure).__name__
+                if attempt >= self.max_retries:
+                    UPSTREAM_ERRORS.inc(call_site=call_site, error=error)
+                    status_code = 429 if isinstance(failure, QUOTA_ERRORS) else 503
+                    raise UpstreamOverloaded(f"Upstream model unavailable: {failure}", self._backoff(attempt + 1), status_code) from failure
+                # Full jitter, outside the in-flight slot so other calls can proceed meanwhile.
+                backoff = random.uniform(0, self._backoff(attempt))
+                left = remaining()
+                if left is not None and backoff >= left:
+                    DEADLINES_EXCEEDED.inc(call_site=call_site)
+                    raise DeadlineExceeded() from failure
+                UPSTREAM_RETRIES.inc(call_site=call_site, error=error)
+                await asyncio.sleep(backoff)
+                attempt += 1
+
+    async def _attempt(self, coroutine_fn, model_name, estimated_tokens, call_site, timeout, attempt):
+        """One gated call of coroutine_fn(model_name). A timeout becomes a retryable error, or DeadlineExceeded."""
+        limit = bounded(timeout)
+        if limit <= 0:
+            raise DeadlineExceeded()
+        start = time.monotonic()
+        with span("upstream.wait", call_site=call_site, attempt=attempt, model=model_name):
+            await self._acquire(estimated_tokens, call_site, max_wait=min(self.max_wait_seconds, limit))
+        UPSTREAM_CALLS.inc(call_site=call_site)
+        call_start = time.monotonic()
+        streaming = False
+        try:
+            response = await asyncio.wait_for(coroutine_fn(model_name), limit - (call_start - start))
+            streaming = isinstance(response, LLMStream)
+        except asyncio.TimeoutError:
+            UPSTREAM_TIMEOUTS.inc(call_site=call_site)
+            left = remaining()
+            if left is not None and left <= 0:
+                raise DeadlineExceeded() from None
+            raise TransientUpstreamError(f"Model call timed out after {limit:.1f}s.") from None
+        except QUOTA_ERRORS:
+            self._decrease_rate()
+            raise
+        except RETRYABLE_ERRORS:
+            raise
+        except Exception as e:
+            UPSTREAM_ERRORS.inc(call_site=call_site, error=type(e).__name__)
+            raise
+        finally:
+            if not streaming:
+                self._release()
+        self._increase_rate()
+        self._latency(call_site).observe(time.monotonic() - call_start)
+        if streaming:
+            # Generation goes on while the caller reads the stream: the in-flight slot is held,
+            # and the actual usage charged, until the stream is used up or closed.
+            response.on_close(lambda: self._finish_stream(response, estimated_tokens))
+            return response
+        self._record_usage(response, estimated_tokens)
+        if isinstance(response, LLMResponse):
+            record_usage(call_site, response)
+        return response
+
+    async def _hedged_attempt(self, coroutine_fn, model_name, hedge_model, estimated_tokens, call_site, timeout, attempt):
+        """
+        Like _attempt, but once the call has run longer than the call site's recent p95 latency, a
+        duplicate is sent to `hedge_model` and whichever answers first wins. No hedge is sent while
+        the gate is saturated, so hedging never adds queueing under load.
+        """
+        delay = self._latency(call_site).quantile(UPSTREAM_HEDGE_QUANTILE, UPSTREAM_HEDGE_MIN_SAMPLES,
+                                                  UPSTREAM_HEDGE_DEFAULT_DELAY_SECONDS)
+        primary = asyncio.ensure_future(self._attempt(coroutine_fn, model_name, estimated_tokens, call_site, timeout, attempt))
+        attempts = [primary]
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and self._waiting == 0 and self._in_flight < self.max_in_flight:
+                UPSTREAM_HEDGES.inc(call_site=call_site, result="launched")
+                hedged = asyncio.ensure_future(self._attempt(coroutine_fn, hedge_model, estimated_tokens, call_site, timeout, attempt))
+                attempts.append(hedged)
+                tasks.add(hedged)
+                while tasks:
+                    done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.exception() is None:
+                            if task is hedged:
+                                UPSTREAM_HEDGES.inc(call_site=call_site, result="won")
+                            return task.result()
+            # Not hedged, or both calls failed: the first call's outcome stands.
+            return await primary
+        finally:
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # a loser that failed in the same round as the winner: mark it retrieved
+
+    async def _acquire(self, estimated_tokens, call_site, max_wait=None):
+        if self._waiting >= self.max_queue:
+            UPSTREAM_REJECTIONS.inc(call_site=call_site, reason="queue_full")
+            raise UpstreamOverloaded("Too many requests are waiting for the model; try again shortly.", self.max_wait_seconds, 503)
+        max_wait = self.max_wait_seconds if max_wait is None else max_wait
+        start = time.monotonic()
+        self._waiting += 1
+        try:
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), timeout=max_wait)
+            except asyncio.TimeoutError:
+                UPSTREAM_REJECTIONS.inc(call_site=call_site, reason="concurrency")
+                raise UpstreamOverloaded("The model is busy; try again shortly.", self.max_wait_seconds, 503) from None
+            try:
+                wait = max(self.requests.wait_time(1), self.tokens.wait_time(estimated_tokens))
+                wait_left = max_wait - (time.monotonic() - start)
+                if wait > wait_left:
+                    UPSTREAM_REJECTIONS.inc(call_site=call_site, reason="rate_limit")
+                    raise UpstreamOverloaded("Rate limit reached for the model; try again later.", wait, 429)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            except BaseException:
+                self.semaphore.release()
+                raise
+            self.requests.take(1)
+            self.tokens.take(estimated_tokens)
+        finally:
+            self._waiting -= 1
+        UPSTREAM_WAIT.observe(time.monotonic() - start, call_site=call_site)
+        self._in_flight += 1
+        UPSTREAM_IN_FLIGHT.set(self._in_flight)
+
+    def _release(self):
+        self._in_flight -= 1
+        UPSTREAM_IN_FLIGHT.set(self._in_flight)
+        self.semaphore.release()
+
+    def _latency(self, call_site) -> LatencyWindow:
+        window = self._latencies.get(call_site)
+        if window is None:
+            window = self._latencies[call_site] = LatencyWindow()
+        return window
+
+    def _record_usage(self, response, estimated_tokens):
+        actual = getattr(response, "total_tokens", 0)
+        if actual > estimated_tokens:
+            self.tokens.take(actual - estimated_tokens)
+
+    def _finish_stream(self, stream, estimated_tokens):
+        # Streams record their usage with their consumer (record_usage); the gate only charges its bucket.
+        self._release()
+        if stream.response is not None:
+            self._record_usage(stream.response, estimated_tokens)
+
+    def _backoff(self, attempt: int) -> float:
+        return min(MAX_BACKOFF_SECONDS, self.backoff_base_seconds * (2 ** attempt))
+
+    def _decrease_rate(self):
+        new_rpm = max(self.configured_rpm * MIN_RATE_FRACTION, self.requests.capacity * RATE_DECREASE_FACTOR)
+        self._set_rate(new_rpm)
+
+    def _increase_rate(self):
+        if self.requests.capacity < self.configured_rpm:
+            self._set_rate(min(self.configured_rpm, self.requests.capacity + self.configured_rpm * RATE_INCREASE_FRACTION))
+
+    def _set_rate(self, requests_per_minute):
+        self.requests.capacity = requests_per_minute
+        self.requests.rate = requests_per_minute / 60.0
+        self.requests.tokens = min(self.requests.tokens, requests_per_minute)
+
+
+upstream_gate = UpstreamGate()
+
+
+async def read_stream(stream, deadline, call_site="agent"):
+    """
+    Yields the chunks of `stream`, waiting for each one no later than `deadline` (a
+    time.monotonic() value; None waits as long as it takes). Raises DeadlineExceeded once
+    the deadline passes, which ends the generation and frees its in-flight slot.
+    """
+    chunks = stream.__aiter__()
+    try:
+        while True:
+            timeout = None
+            if deadline is not None:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    DEADLINES_EXCEEDED.inc(call_site=call_site)
+                    raise DeadlineExceeded()
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                UPSTREAM_TIMEOUTS.inc(call_site=call_site)
+                DEADLINES_EXCEEDED.inc(call_site=call_site)
+                raise DeadlineExceeded() from None
+            yield chunk
+    finally:
+        await chunks.aclose()
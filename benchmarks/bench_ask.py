@@ -0,0 +1,180 @@
+# multi_agent_tutor/benchmarks/bench_ask.py
+"""
+Offline benchmark of POST /ask. Drives the FastAPI app in-process through a minimal
+ASGI client, with the deterministic fake LLM backend in place of Gemini, so it needs
+no API key or network access and can run in CI.
+
+For each concurrency level it sends --requests queries from a fixed mix (math with
+calculations, physics constants, conceptual and general questions, fast-path
+arithmetic) and reports p50/p95/p99 latency, throughput, upstream (LLM backend)
+calls per query, and prompt + output tokens per query (as the fake backend counts them,
+~4 characters per token including system instructions and tool results).
+
+Usage:
+    python benchmarks/bench_ask.py --concurrency 1,8,32 --requests 200
+    python benchmarks/bench_ask.py --latency 0.2 --jitter 0.1 --error-rate 0.05 --json results.json
+
+By default every query is distinct, so the answer cache and request coalescing do not
+hide pipeline cost; pass --distinct N to cycle through N distinct queries and
+--use-cache to let repeated queries hit the cache.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Must be set before config is imported. Upstream rate limits default to effectively
+# unlimited so the benchmark measures the pipeline; export them to benchmark the gate.
+os.environ["LLM_BACKEND"] = "fake"
+os.environ.setdefault("UPSTREAM_REQUESTS_PER_MINUTE", "1000000000")
+os.environ.setdefault("UPSTREAM_TOKENS_PER_MINUTE", "1000000000")
+# The app logs every request; keep the report readable.
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+QUERY_MIX = (
+    "Can you solve 2x + 5 = 11 and check it with 12 * 7 - 3? (case {i})",
+    "What is the value of the speed of light and the planck constant? (case {i})",
+    "Explain the Pythagorean theorem with an example. (case {i})",
+    "Explain Newton's second law of motion. (case {i})",
+    "Who wrote the novel Pride and Prejudice? (case {i})",
+    "What is {i} + 17 * 3?",
+)
+
+
+def percentile(sorted_values, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def asgi_post(app, path: str, payload: dict):
+    """Sends one JSON POST through the ASGI app and returns (status, body bytes)."""
+    body = json.dumps(payload).encode("utf-8")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("ascii"),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("ascii"))],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    request_sent = False
+    response_done = asyncio.Event()
+    status = None
+    chunks = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_done.set()
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+
+async def run_level(app, backend, concurrency: int, total_requests: int, distinct: int, use_cache: bool, offset: int) -> dict:
+    queue = asyncio.Queue()
+    for n in range(total_requests):
+        i = offset + (n % distinct if distinct else n)
+        queue.put_nowait(QUERY_MIX[i % len(QUERY_MIX)].format(i=i))
+    latencies = []
+    statuses = {}
+
+    async def worker():
+        while not queue.empty():
+            query = queue.get_nowait()
+            start = time.perf_counter()
+            status, _ = await asgi_post(app, "/ask", {"query": query, "use_cache": use_cache})
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    from metrics import LLM_TOKENS
+    calls_before = backend.calls
+    prompt_before, output_before = LLM_TOKENS.sum(kind="prompt"), LLM_TOKENS.sum(kind="output")
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "wall_seconds": wall,
+        "throughput_rps": total_requests / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "upstream_calls_per_query": (backend.calls - calls_before) / total_requests,
+        "prompt_tokens_per_query": (LLM_TOKENS.sum(kind="prompt") - prompt_before) / total_requests,
+        "output_tokens_per_query": (LLM_TOKENS.sum(kind="output") - output_before) / total_requests,
+        "statuses": statuses,
+    }
+
+
+async def run(args) -> list:
+    from agents.fake_backend import FakeBackend
+    from agents.llm_backend import set_backend
+
+    backend = FakeBackend(latency_seconds=args.latency, latency_jitter_seconds=args.jitter,
+                          error_rate=args.error_rate, seed=args.seed)
+    set_backend(backend)
+    from main import app  # imported after the backend is installed; the tutor binds it at construction
+
+    results = []
+    for level, concurrency in enumerate(args.concurrency):
+        result = await run_level(app, backend, concurrency, args.requests, args.distinct, args.use_cache,
+                                 offset=level * args.requests)
+        results.append(result)
+        print(f"c={result['concurrency']:<4} n={result['requests']:<5} "
+              f"p50={result['p50_ms']:8.1f}ms p95={result['p95_ms']:8.1f}ms p99={result['p99_ms']:8.1f}ms "
+              f"throughput={result['throughput_rps']:8.1f} req/s "
+              f"upstream/query={result['upstream_calls_per_query']:.2f} "
+              f"tokens/query={result['prompt_tokens_per_query']:.0f}+{result['output_tokens_per_query']:.0f} "
+              f"statuses={result['statuses']}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline /ask benchmark with the fake LLM backend")
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake backend latency per call, seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra uniform random latency per call, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake backend calls that fail")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--distinct", type=int, default=0, help="Cycle through N distinct queries (0 = all distinct)")
+    parser.add_argument("--use-cache", action="store_true", help="Let repeated queries hit the answer cache")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# multi_agent_tutor/benchmarks/bench_startup.py
+"""
+Startup benchmark: how long a fresh worker takes to import the app and to become ready.
+
+Each run starts a new Python process, so nothing is shared between runs:
+  * import:    time to `import main` (measured inside the child), and whether the LLM
+               SDK was imported as a side effect;
+  * listening: time from spawning `uvicorn main:app` until it answers HTTP at all;
+  * ready:     time from spawning until GET /ready returns 200 (warmup finished).
+
+Uses the offline fake LLM backend by default, so it needs no API key or network access;
+pass --backend gemini (with GEMINI_API_KEY set) to include the SDK import and the
+connection warmup against the real API.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --backend gemini --json startup.json
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+IMPORT_PROBE = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    "import main\n"
+    "elapsed = time.perf_counter() - start\n"
+    "print(elapsed, 'google.generativeai' in sys.modules)\n"
+)
+
+
+def child_env(backend: str) -> dict:
+    env = dict(os.environ, LLM_BACKEND=backend, LOG_LEVEL="ERROR")
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def measure_import(env: dict):
+    """Returns (seconds to import main, whether the LLM SDK was imported)."""
+    output = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout.split()
+    return float(output[0]), output[1] == "True"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def http_status(url: str):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError, OSError):
+        return None
+
+
+def measure_ready(env: dict, timeout: float):
+    """Returns (seconds until the server answers, seconds until /ready is 200) for one fresh server."""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/ready"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    listening = None
+    try:
+        while time.perf_counter() - start < timeout:
+            status = http_status(url)
+            if status is not None and listening is None:
+                listening = time.perf_counter() - start
+            if status == 200:
+                return listening, time.perf_counter() - start
+            if server.poll() is not None:
+                raise RuntimeError(f"Server exited with code {server.returncode} before becoming ready.")
+            time.sleep(0.01)
+        raise RuntimeError(f"Server was not ready after {timeout:.0f}s (last /ready status: {status}).")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def summarize(values) -> dict:
+    return {"median": statistics.median(values), "min": min(values), "max": max(values)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per measurement")
+    parser.add_argument("--backend", default="fake", choices=("fake", "gemini"))
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for /ready per run")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    env = child_env(args.backend)
+    imports = [measure_import(env) for _ in range(args.runs)]
+    servers = [measure_ready(env, args.timeout) for _ in range(args.runs)]
+    results = {
+        "backend": args.backend,
+        "runs": args.runs,
+        "import_seconds": summarize([seconds for seconds, _ in imports]),
+        "sdk_imported_by_app_import": any(sdk for _, sdk in imports),
+        "listening_seconds": summarize([listening for listening, _ in servers]),
+        "ready_seconds": summarize([ready for _, ready in servers]),
+    }
+
+    print(f"backend={args.backend} runs={args.runs} sdk_imported_by_app_import={results['sdk_imported_by_app_import']}")
+    for name in ("import_seconds", "listening_seconds", "ready_seconds"):
+        stats = results[name]
+        print(f"{name:<18} median={stats['median'] * 1000:8.1f}ms min={stats['min'] * 1000:8.1f}ms max={stats['max'] * 1000:8.1f}ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
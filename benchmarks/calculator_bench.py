@@ -0,0 +1,99 @@
+# multi_agent_tutor/benchmarks/calculator_bench.py
+"""
+Micro-benchmarks for the calculator engine (agents/tools/calculator_engine.py).
+
+- legacy: the previous recursive AST walk, re-parsing the expression on every call
+- cold: engine compile (validation + flattening) and evaluation with an empty plan cache
+- memoized: engine evaluation of an already compiled expression
+- scalar loop vs evaluate_many: one expression over N rows of variable bindings
+- rejection: time to refuse inputs that would exhaust CPU/memory without limits
+
+Usage:
+    python benchmarks/calculator_bench.py --iterations 20000 --rows 10000
+"""
+import argparse
+import ast
+import operator as op
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from agents.tools.calculator_engine import CalculatorError, compile_expression, evaluate
+
+EXPRESSIONS = ("2 * 5 + (3 - 1) / 2 ** 2", "(2 + 3) * (7 - 2) / 5", "15 * 4 + 7", "((1.5 + 2.25) * 4 - 3) / 7 ** 2")
+VECTOR_EXPRESSION = "v * t + 0.5 * a * t ** 2"
+PATHOLOGICAL = (
+    "9**9**9", "10**10**10", "2**(2**64)", "round(7, -10**20)", "round(7, -10**300)",
+    "+".join(["1"] * 500), "(" * 150 + "1" + ")" * 150,
+)
+
+LEGACY_OPERATORS = {
+    ast.Add: op.add, ast.Sub: op.sub, ast.Mult: op.mul,
+    ast.Div: op.truediv, ast.Pow: op.pow, ast.BitXor: op.xor,
+    ast.USub: op.neg,
+}
+
+
+def legacy_eval(node):
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.BinOp):
+        return LEGACY_OPERATORS[type(node.op)](legacy_eval(node.left), legacy_eval(node.right))
+    if isinstance(node, ast.UnaryOp):
+        return LEGACY_OPERATORS[type(node.op)](legacy_eval(node.operand))
+    raise TypeError(node)
+
+
+def per_call_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calculator engine micro-benchmarks")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--rows", type=int, default=10000)
+    args = parser.parse_args()
+    n = args.iterations
+
+    for expression in EXPRESSIONS:
+        legacy = per_call_us(lambda: legacy_eval(ast.parse(expression, mode="eval").body), n)
+
+        def cold():
+            compile_expression.cache_clear()
+            evaluate(expression)
+        cold_us = per_call_us(cold, n)
+        evaluate(expression)
+        memoized = per_call_us(lambda: evaluate(expression), n)
+        print(f"{expression!r:40} legacy={legacy:6.1f}us cold={cold_us:6.1f}us memoized={memoized:5.2f}us")
+
+    rng = random.Random(0)
+    bindings = {name: [rng.uniform(0, 100) for _ in range(args.rows)] for name in ("v", "t", "a")}
+    plan = compile_expression(VECTOR_EXPRESSION)
+    start = time.perf_counter()
+    scalar = [plan.evaluate({name: bindings[name][i] for name in bindings}) for i in range(args.rows)]
+    scalar_s = time.perf_counter() - start
+    start = time.perf_counter()
+    vectorized = plan.evaluate_many(bindings)
+    vector_s = time.perf_counter() - start
+    assert scalar == vectorized
+    print(f"{VECTOR_EXPRESSION!r} over {args.rows} rows: scalar loop={scalar_s * 1e3:.1f}ms "
+          f"evaluate_many={vector_s * 1e3:.1f}ms ({scalar_s / vector_s:.1f}x)")
+
+    for expression in PATHOLOGICAL:
+        start = time.perf_counter()
+        try:
+            evaluate(expression)
+            outcome = "evaluated"
+        except CalculatorError as e:
+            outcome = f"rejected ({e})"
+        print(f"{expression[:24]!r:28} {(time.perf_counter() - start) * 1e6:8.1f}us {outcome[:70]}")
+
+
+if __name__ == "__main__":
+    main()
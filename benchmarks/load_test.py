@@ -0,0 +1,76 @@
+# multi_agent_tutor/benchmarks/load_test.py
+"""
+Fires N concurrent POST /ask requests at a running server and reports whether
+they overlapped or queued behind each other.
+
+Usage:
+    uvicorn main:app --port 8000
+    python benchmarks/load_test.py --url http://127.0.0.1:8000/ask --concurrency 8
+
+If the pipeline blocks the event loop, wall time is roughly the sum of the
+individual latencies (overlap factor ~1.0). With the async pipeline the
+requests run side by side and the overlap factor approaches the concurrency.
+
+Each request gets a distinct query (a "(case {i})" suffix) and bypasses the
+answer cache, so identical in-flight requests are not coalesced into one
+pipeline run and the overlap measured is that of real, concurrent answers.
+"""
+import argparse
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def send_query(url: str, query: str, t0: float) -> dict:
+    body = json.dumps({"query": query, "use_cache": False}).encode("utf-8")
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    start = time.perf_counter() - t0
+    try:
+        with urllib.request.urlopen(req, timeout=120) as resp:
+            status = resp.status
+            resp.read()
+    except urllib.error.HTTPError as e:
+        status = e.code
+    end = time.perf_counter() - t0
+    return {"start": start, "end": end, "latency": end - start, "status": status}
+
+
+def run(url: str, concurrency: int, query: str) -> dict:
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda i: send_query(url, f"{query} (case {i})", t0), range(concurrency)))
+    wall = time.perf_counter() - t0
+
+    latency_sum = sum(r["latency"] for r in results)
+    # Requests overlap if a later one started before an earlier one finished.
+    last_start = max(r["start"] for r in results)
+    first_end = min(r["end"] for r in results)
+    return {
+        "requests": results,
+        "wall_time": wall,
+        "latency_sum": latency_sum,
+        "overlap_factor": latency_sum / wall if wall else 0.0,
+        "all_in_flight_together": last_start < first_end,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for POST /ask")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/ask")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--query", default="Explain the Pythagorean theorem.")
+    args = parser.parse_args()
+
+    report = run(args.url, args.concurrency, args.query)
+    for i, r in enumerate(sorted(report["requests"], key=lambda r: r["start"])):
+        print(f"#{i:02d} start={r['start']:.3f}s end={r['end']:.3f}s latency={r['latency']:.3f}s status={r['status']}")
+    print(f"Wall time:            {report['wall_time']:.3f}s")
+    print(f"Sum of latencies:     {report['latency_sum']:.3f}s")
+    print(f"Overlap factor:       {report['overlap_factor']:.2f}x (1.0 = fully serialized)")
+    print(f"All in flight at once: {report['all_in_flight_together']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# multi_agent_tutor/benchmarks/stream_failure_check.py
+"""
+Offline regression check: a streamed answer that fails after part of it was sent must
+end with an SSE error event and must not be cached or kept in the session.
+
+Scripts the fake LLM backend to stream a turn with text and a tool call, then fail the
+next turn. It then checks that /ask-stream reported an error and that the answer cache
+and the session history stayed empty. A repeated /ask must reach the backend again
+instead of being served the broken answer. Exits non-zero on failure, so it can run in CI.
+
+Usage:
+    python benchmarks/stream_failure_check.py
+"""
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Sets LLM_BACKEND=fake and quiet logging before config is imported.
+from bench_ask import asgi_post  # noqa: E402
+
+QUERY = "Can you solve 2x + 5 = 11 and check it with 12 * 7 - 3?"
+
+
+def sse_events(body: bytes) -> list:
+    """(event, data) pairs of an SSE body; plain 'data:' messages have event None."""
+    events = []
+    for message in body.decode("utf-8").split("\n\n"):
+        event, data = None, None
+        for line in message.splitlines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+        if data is not None:
+            events.append((event, data))
+    return events
+
+
+async def check() -> list:
+    import main
+    from agents.fake_backend import FakeBackend
+    from agents.llm_backend import LLMResponse, ToolCall, set_backend
+
+    partial = LLMResponse(text="First, 12 * 7 - 3 is", tool_calls=[ToolCall("simple_calculator", {"expression": "12 * 7 - 3"})])
+    backend = FakeBackend(responses=[partial, RuntimeError("stream broke mid-answer")], latency_seconds=0.0, error_rate=0.0)
+    set_backend(backend)
+
+    failures = []
+    status, body = await asgi_post(main.app, "/ask-stream", {"query": QUERY, "session_id": "stream-failure-check"})
+    events = sse_events(body)
+    if status != 200 or not events or events[-1][0] != "error":
+        failures.append(f"/ask-stream should end with an error event, got status {status} and {events}")
+    if not any(event is None and data.get("text") for event, data in events):
+        failures.append("the scripted partial text was not streamed; the check did not exercise the failure path")
+
+    cache_key = main.answer_cache.make_key(QUERY, main.DEFAULT_GEMINI_MODEL, main.tutor_bot.prompt_version)
+    if await main.answer_cache.get(cache_key) is not None:
+        failures.append("the partial answer was stored in the answer cache")
+    history, _ = main.session_store.get_history("stream-failure-check")
+    if history:
+        failures.append(f"the partial answer was stored in the session history: {history}")
+
+    calls_before = backend.calls
+    status, _ = await asgi_post(main.app, "/ask", {"query": QUERY})
+    if status != 200 or backend.calls == calls_before:
+        failures.append("a repeated /ask did not reach the backend")
+    return failures
+
+
+def main():
+    failures = asyncio.run(check())
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: a stream that fails mid-answer ends with an error event and nothing is cached.")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,85 @@ from dotenv import load_dotenv
 
 load_dotenv() # This is fine to keep, it won't find a .env on Railway but doesn't hurt
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY") # Checked when the Gemini backend is created, not at import
 
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY not found in .env file or environment variables. Please ensure it is set.")
+DEFAULT_GEMINI_MODEL = "gemini-1.5-flash-latest"
+# Cheaper, faster model that retries and hedged calls switch to when the default model is slow or failing ("" to disable).
+FALLBACK_GEMINI_MODEL = os.getenv("FALLBACK_GEMINI_MODEL", "gemini-1.5-flash-8b")
 
-DEFAULT_GEMINI_MODEL = "gemini-1.5-flash-latest"
\ No newline at end of file
+# Logging: level, "json" or "text" lines, queue size before records are dropped, and sampling of verbose payloads (e.g. full answers).
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_QUEUE_MAX_SIZE = int(os.getenv("LOG_QUEUE_MAX_SIZE", "10000"))
+LOG_VERBOSE_SAMPLE_RATE = float(os.getenv("LOG_VERBOSE_SAMPLE_RATE", "0.01"))
+LOG_MAX_PAYLOAD_CHARS = int(os.getenv("LOG_MAX_PAYLOAD_CHARS", "500"))
+
+# Tracing: fraction of requests traced, OTLP/JSON file to export traces to (tracing is off unless set),
+# and whether clients may request a per-request timing breakdown with the X-Debug-Timing header.
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH") or None
+TRACE_EXPORT_QUEUE_SIZE = int(os.getenv("TRACE_EXPORT_QUEUE_SIZE", "1000"))
+TRACE_DEBUG_HEADER_ENABLED = os.getenv("TRACE_DEBUG_HEADER_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# LLM backend: "gemini" for the real API, "fake" for the offline scripted backend used by benchmarks and CI.
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
+# Fake backend behaviour: per-call latency (plus up to the jitter), fraction of calls that fail, and RNG seed.
+FAKE_LLM_LATENCY_SECONDS = float(os.getenv("FAKE_LLM_LATENCY_SECONDS", "0.05"))
+FAKE_LLM_LATENCY_JITTER_SECONDS = float(os.getenv("FAKE_LLM_LATENCY_JITTER_SECONDS", "0.0"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0.0"))
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+
+# Startup: warm the LLM backend, agents and provider connection in the background after boot
+# (GET /ready answers 503 until it finishes), waiting at most this long for the provider.
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "10"))
+
+# Local fast-path router: queries it classifies at or above this confidence skip the LLM classifier.
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.6"))
+# Fraction of locally routed queries also sent to the LLM classifier in the background to measure routing accuracy.
+ROUTER_SHADOW_SAMPLE_RATE = float(os.getenv("ROUTER_SHADOW_SAMPLE_RATE", "0.0"))
+
+# Answer cache for /ask. Set RESPONSE_CACHE_DB_PATH to a file path to share cached answers between workers.
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+RESPONSE_CACHE_DB_PATH = os.getenv("RESPONSE_CACHE_DB_PATH") or None
+RESPONSE_CACHE_MAX_DISK_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_DISK_ENTRIES", "100000"))
+
+# Per-session conversation memory.
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "10"))
+SESSION_MAX_HISTORY_TOKENS = int(os.getenv("SESSION_MAX_HISTORY_TOKENS", "2000"))
+SESSION_MAX_CHARS_PER_MESSAGE = int(os.getenv("SESSION_MAX_CHARS_PER_MESSAGE", "2000"))
+SESSION_IDLE_TTL_SECONDS = float(os.getenv("SESSION_IDLE_TTL_SECONDS", "1800"))
+
+# /ask-batch: maximum queries per request and agent calls running at once per batch.
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "50"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
+
+# Maximum model turns per agent answer when tools are available (each turn may run several tool calls).
+AGENT_MAX_MODEL_TURNS = int(os.getenv("AGENT_MAX_MODEL_TURNS", "3"))
+# Longest answer per model call, and tokens (prompt + output, all model calls) one answer may spend
+# before agents stop calling tools and answer with what they have (0 disables the budget).
+AGENT_MAX_OUTPUT_TOKENS = int(os.getenv("AGENT_MAX_OUTPUT_TOKENS", "2048"))
+REQUEST_TOKEN_BUDGET = int(os.getenv("REQUEST_TOKEN_BUDGET", "20000"))
+
+# Upstream gate shared by every Gemini call: concurrency, rate limits, load shedding and retries.
+UPSTREAM_MAX_IN_FLIGHT = int(os.getenv("UPSTREAM_MAX_IN_FLIGHT", "16"))
+UPSTREAM_REQUESTS_PER_MINUTE = float(os.getenv("UPSTREAM_REQUESTS_PER_MINUTE", "600"))
+UPSTREAM_TOKENS_PER_MINUTE = float(os.getenv("UPSTREAM_TOKENS_PER_MINUTE", "1000000"))
+UPSTREAM_MAX_QUEUE = int(os.getenv("UPSTREAM_MAX_QUEUE", "64"))
+UPSTREAM_MAX_WAIT_SECONDS = float(os.getenv("UPSTREAM_MAX_WAIT_SECONDS", "10"))
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "2"))
+UPSTREAM_BACKOFF_BASE_SECONDS = float(os.getenv("UPSTREAM_BACKOFF_BASE_SECONDS", "0.5"))
+
+# Tail latency: end-to-end budget per answer, longest single model call (both also cut short by
+# what is left of the budget), and the shorter limit for the intent classifier.
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "30"))
+UPSTREAM_CALL_TIMEOUT_SECONDS = float(os.getenv("UPSTREAM_CALL_TIMEOUT_SECONDS", "20"))
+CLASSIFIER_TIMEOUT_SECONDS = float(os.getenv("CLASSIFIER_TIMEOUT_SECONDS", "3"))
+# Hedged calls: idempotent short calls (the classifier) send a duplicate once the first has run longer
+# than this latency quantile of recent calls, or than the default delay until enough calls were seen.
+UPSTREAM_HEDGE_ENABLED = os.getenv("UPSTREAM_HEDGE_ENABLED", "true").lower() in ("1", "true", "yes")
+UPSTREAM_HEDGE_QUANTILE = float(os.getenv("UPSTREAM_HEDGE_QUANTILE", "0.95"))
+UPSTREAM_HEDGE_MIN_SAMPLES = int(os.getenv("UPSTREAM_HEDGE_MIN_SAMPLES", "20"))
+UPSTREAM_HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("UPSTREAM_HEDGE_DEFAULT_DELAY_SECONDS", "1.0"))
@@ -0,0 +1,56 @@
+# multi_agent_tutor/deadlines.py
+"""
+Request deadlines.
+
+`TutorAgent.route_query` (and `route_batch`) open a `deadline_after(seconds)` block; like
+the current tracing span, the deadline lives in a contextvar, so every agent, tool and
+upstream call made for that request sees it without it being passed around, including
+across asyncio.gather. The upstream gate bounds each model call by `bounded(timeout)`,
+so stages time out in line with what is left of the request's budget.
+
+Streamed answers cannot hold a contextvar across their yields, so `route_query_stream`
+computes an absolute deadline up front and hands it down as an argument.
+"""
+import contextlib
+import contextvars
+import time
+
+_deadline = contextvars.ContextVar("request_deadline", default=None)  # time.monotonic() value
+
+
+@contextlib.contextmanager
+def deadline_after(seconds: float):
+    """Sets a deadline `seconds` from now for the with-block, unless an earlier one is already set."""
+    with deadline_at(time.monotonic() + seconds):
+        yield
+
+
+@contextlib.contextmanager
+def deadline_at(deadline):
+    """
+    Sets `deadline` (a time.monotonic() value; None for none) for the with-block, unless an
+    earlier one is already set. In an async generator the block must not span a `yield`, or
+    the deadline would leak into the consumer; streams pass their deadline down explicitly
+    and enter it around each await instead.
+    """
+    current = _deadline.get()
+    if deadline is None or (current is not None and current <= deadline):
+        yield
+        return
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Seconds left before the current deadline (may be negative), or None without a deadline."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def bounded(timeout: float) -> float:
+    """`timeout`, shortened to the time left before the current deadline."""
+    left = remaining()
+    return timeout if left is None else min(timeout, left)
@@ -1,15 +1,62 @@
 # multi_agent_tutor/main.py
+import time
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from agents.base_agent import StreamedAnswerFailed
 from agents.tutor_agent import TutorAgent
+from agents.upstream import UpstreamOverloaded
+from metrics import render_prometheus, HTTP_REQUEST_DURATION, HTTP_TIME_TO_FIRST_BYTE, PROMPT_HISTORY_TOKENS, STARTUP_IMPORT_SECONDS
+from structured_logging import get_logger
+from tracing import start_trace, use_span, finish_trace, timing_header
+from response_cache import ResponseCache, is_cacheable
+from singleflight import SingleFlight
+from sessions import SessionStore
+from startup import Warmup
+from config import (
+    DEFAULT_GEMINI_MODEL,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_TTL_SECONDS,
+    RESPONSE_CACHE_DB_PATH,
+    RESPONSE_CACHE_MAX_DISK_ENTRIES,
+    SESSION_MAX_SESSIONS,
+    SESSION_MAX_TURNS,
+    SESSION_MAX_HISTORY_TOKENS,
+    SESSION_MAX_CHARS_PER_MESSAGE,
+    SESSION_IDLE_TTL_SECONDS,
+    TRACE_DEBUG_HEADER_ENABLED,
+    BATCH_MAX_QUERIES,
+    WARMUP_ENABLED,
+)
 import uvicorn
-import time
+import asyncio
+import json
+import math
+
+logger = get_logger("api")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so the server accepts connections immediately; /ready reports when it is done.
+    if WARMUP_ENABLED:
+        warmup_task = asyncio.create_task(warmup.run(tutor_bot.warm_up))
+    else:
+        warmup.mark_ready()
+        warmup_task = None
+    yield
+    if warmup_task is not None:
+        warmup_task.cancel()
 
 app = FastAPI(
     title="Multi-Agent Tutoring Bot",
     description="An AI Tutor that delegates questions to specialist agents (Math, Physics) using Google Gemini.",
-    version="0.2.1"
+    version="0.2.1",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -18,24 +65,106 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST"],
     allow_headers=["*"],
+    expose_headers=["X-Session-Id", "X-Debug-Timing"],
 )
 
+# Cheap to construct: the LLM SDK and the specialist agents are initialized lazily or by the warmup.
 tutor_bot = TutorAgent()
+warmup = Warmup()
+answer_cache = ResponseCache(
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+    ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+    db_path=RESPONSE_CACHE_DB_PATH,
+    max_disk_entries=RESPONSE_CACHE_MAX_DISK_ENTRIES,
+)
+in_flight_queries = SingleFlight()
+session_store = SessionStore(
+    max_sessions=SESSION_MAX_SESSIONS,
+    max_turns=SESSION_MAX_TURNS,
+    max_tokens=SESSION_MAX_HISTORY_TOKENS,
+    max_chars_per_message=SESSION_MAX_CHARS_PER_MESSAGE,
+    idle_ttl_seconds=SESSION_IDLE_TTL_SECONDS,
+)
 
 class QueryRequest(BaseModel):
     query: str
+    use_cache: bool = True # Set to false to force a fresh answer
+    session_id: Optional[str] = Field(None, max_length=128) # Omit to start a new conversation
 
 class QueryResponse(BaseModel):
     answer: str
+    session_id: str
+
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+    use_cache: bool = True
+
+class BatchItemResult(BaseModel):
+    answer: Optional[str] = None
+    subject: Optional[str] = None # 'math', 'physics', 'general', 'fast_path', or 'cache'
+    error: Optional[str] = None
+    status_code: int = 200 # Per-item status; the batch itself succeeds even if some items fail
+
+class BatchQueryResponse(BaseModel):
+    results: List[BatchItemResult] # Same order as the request's queries
 
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    duration = time.time() - start_time
-    print(f"Request: {request.method} {request.url.path} - Completed in {duration:.4f} secs - Status: {response.status_code}")
+    start_time = time.perf_counter()
+    # Clients can ask for a per-stage timing breakdown with "X-Debug-Timing: 1"; such requests are always traced.
+    debug_timing = TRACE_DEBUG_HEADER_ENABLED and request.headers.get("x-debug-timing", "0").lower() not in ("", "0", "false")
+    root_span = start_trace(f"{request.method} {request.url.path}", force=debug_timing,
+                            **{"http.method": request.method, "http.target": request.url.path})
+    try:
+        with use_span(root_span):
+            response = await call_next(request)
+    except Exception as e:
+        if root_span is not None:
+            finish_trace(root_span, e)
+        raise
+    if debug_timing:
+        # Streamed responses send headers first, so only stages finished before the first byte appear.
+        response.headers["X-Debug-Timing"] = timing_header(root_span)
+    body_iterator = response.body_iterator
+
+    # Time to first byte and total latency differ for streamed answers, so both are
+    # measured from the body as it is sent rather than when the handler returns.
+    async def timed_body():
+        first_byte_time = None
+        try:
+            async for chunk in body_iterator:
+                if first_byte_time is None:
+                    first_byte_time = time.perf_counter() - start_time
+                yield chunk
+        finally:
+            duration = time.perf_counter() - start_time
+            if first_byte_time is None:
+                first_byte_time = duration
+            # Labelled by route template, not raw path, so requests for arbitrary URLs can't grow /metrics.
+            route = request.scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            HTTP_TIME_TO_FIRST_BYTE.observe(first_byte_time, path=route_path)
+            HTTP_REQUEST_DURATION.observe(duration, path=route_path, status=response.status_code)
+            logger.info("Request completed", extra={
+                "method": request.method, "path": request.url.path, "status": response.status_code,
+                "ttfb_seconds": round(first_byte_time, 4), "duration_seconds": round(duration, 4),
+            })
+            if root_span is not None:
+                root_span.set(**{"http.status_code": response.status_code})
+                finish_trace(root_span)
+
+    response.body_iterator = timed_body()
     return response
 
+@app.exception_handler(UpstreamOverloaded)
+async def upstream_overloaded_handler(request: Request, exc: UpstreamOverloaded):
+    logger.warning("Shedding request", extra={"path": request.url.path, "status": exc.status_code, "reason": str(exc)})
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
 @app.get("/", tags=["General"])
 async def read_root():
     return {
@@ -44,22 +173,162 @@ async def read_root():
         "ask_endpoint": "/ask (POST)"
     }
 
-@app.post("/ask", response_model=QueryResponse, tags=["Tutoring"])
-async def ask_tutor(request_data: QueryRequest):
-    query = request_data.query
+@app.get("/ready", tags=["General"])
+async def ready():
+    """Readiness probe: 200 once startup warmup has finished, 503 while it runs or if it failed."""
+    return JSONResponse(status_code=200 if warmup.ready else 503, content=warmup.status())
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["General"])
+async def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+def validate_query(query: str) -> str:
     if not query or not query.strip():
         raise HTTPException(status_code=400, detail="Query cannot be empty.")
     if len(query) > 1000:
         raise HTTPException(status_code=413, detail="Query is too long (max 1000 characters).")
+    return query
+
+def load_history(session_id: str) -> list:
+    history, history_tokens = session_store.get_history(session_id)
+    PROMPT_HISTORY_TOKENS.observe(history_tokens)
+    return history
+
+async def answer_and_cache(query: str, cache_key: str) -> str:
+    answer = await tutor_bot.route_query(query)
+    await answer_cache.set(cache_key, answer)
+    return answer
+
+@app.post("/ask", response_model=QueryResponse, tags=["Tutoring"])
+async def ask_tutor(request_data: QueryRequest):
+    query = validate_query(request_data.query)
+
+    session_id = request_data.session_id or session_store.new_session_id()
+    history = load_history(session_id)
 
     try:
-        print(f"Received query for /ask: {query}")
-        answer = tutor_bot.route_query(query)
-        return QueryResponse(answer=answer)
+        logger.debug("Received query", extra={"path": "/ask", "query": query})
+        if history:
+            # Follow-up answers depend on the conversation, so they are neither cached nor shared.
+            answer = await tutor_bot.route_query(query, history)
+        else:
+            cache_key = answer_cache.make_key(query, DEFAULT_GEMINI_MODEL, tutor_bot.prompt_version)
+            answer = await answer_cache.get(cache_key) if request_data.use_cache else None
+            if answer is None:
+                # Identical queries already in flight share one pipeline run instead of starting their own.
+                answer = await in_flight_queries.do(cache_key, lambda: answer_and_cache(query, cache_key))
+        if is_cacheable(answer):
+            session_store.append_exchange(session_id, query, answer)
+        return QueryResponse(answer=answer, session_id=session_id)
+    except UpstreamOverloaded:
+        raise
     except Exception as e:
-        print(f"An error occurred while processing query '{query}': {e}")
+        logger.exception("Error while processing query", extra={"path": "/ask", "query": query})
         raise HTTPException(status_code=500, detail=f"An internal server error occurred: {str(e)}")
 
+@app.post("/ask-batch", response_model=BatchQueryResponse, tags=["Tutoring"])
+async def ask_tutor_batch(request_data: BatchQueryRequest):
+    """
+    Answers a whole problem set in one request. Queries share one classification step and
+    their agent calls run concurrently, so the batch takes about as long as its slowest item.
+    Each item reports its own error; a failing item does not fail the batch.
+    """
+    queries = request_data.queries
+    if not queries:
+        raise HTTPException(status_code=400, detail="Queries cannot be empty.")
+    if len(queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=413, detail=f"Too many queries (max {BATCH_MAX_QUERIES} per batch).")
+    logger.debug("Received batch", extra={"path": "/ask-batch", "size": len(queries)})
+
+    results = [None] * len(queries)
+    keys = {}  # cache key -> indexes of the valid queries sharing it
+    for i, query in enumerate(queries):
+        try:
+            validate_query(query)
+        except HTTPException as e:
+            results[i] = BatchItemResult(error=e.detail, status_code=e.status_code)
+            continue
+        keys.setdefault(answer_cache.make_key(query, DEFAULT_GEMINI_MODEL, tutor_bot.prompt_version), []).append(i)
+
+    to_answer = list(keys)
+    if request_data.use_cache:
+        cached_answers = await asyncio.gather(*(answer_cache.get(key) for key in to_answer))
+        for key, answer in zip(to_answer, cached_answers):
+            for i in keys[key] if answer is not None else ():
+                results[i] = BatchItemResult(answer=answer, subject="cache")
+        to_answer = [key for key, answer in zip(to_answer, cached_answers) if answer is None]
+
+    # Duplicate queries in one batch are answered once.
+    answered = await tutor_bot.route_batch([queries[keys[key][0]] for key in to_answer])
+    cache_writes = []
+    for key, (subject, answer) in zip(to_answer, answered):
+        if isinstance(answer, UpstreamOverloaded):
+            item = BatchItemResult(subject=subject, error=str(answer), status_code=answer.status_code)
+        elif isinstance(answer, Exception):
+            logger.error("Error while answering batch item", extra={"path": "/ask-batch", "error": str(answer)})
+            item = BatchItemResult(subject=subject, error=f"An internal server error occurred: {answer}", status_code=500)
+        else:
+            item = BatchItemResult(answer=answer, subject=subject)
+            cache_writes.append(answer_cache.set(key, answer))
+        for i in keys[key]:
+            results[i] = item
+    await asyncio.gather(*cache_writes)
+    return BatchQueryResponse(results=results)
+
+def sse_event(data: dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@app.post("/ask-stream", tags=["Tutoring"])
+async def ask_tutor_stream(request_data: QueryRequest):
+    """
+    Streams the answer as Server-Sent Events: 'data' events carry text chunks, then a
+    final 'done' event carries the session_id (also sent as the X-Session-Id header).
+    """
+    query = validate_query(request_data.query)
+    logger.debug("Received query", extra={"path": "/ask-stream", "query": query})
+    session_id = request_data.session_id or session_store.new_session_id()
+    history = load_history(session_id)
+    cache_key = answer_cache.make_key(query, DEFAULT_GEMINI_MODEL, tutor_bot.prompt_version)
+    cached_answer = await answer_cache.get(cache_key) if request_data.use_cache and not history else None
+
+    async def event_stream():
+        if cached_answer is not None:
+            session_store.append_exchange(session_id, query, cached_answer)
+            yield sse_event({"text": cached_answer})
+            yield sse_event({"session_id": session_id}, event="done")
+            return
+        chunks = []
+        try:
+            async for chunk in tutor_bot.route_query_stream(query, history):
+                chunks.append(chunk)
+                yield sse_event({"text": chunk})
+        except UpstreamOverloaded as e:
+            yield sse_event({"detail": str(e), "status_code": e.status_code, "retry_after": math.ceil(e.retry_after)}, event="error")
+            return
+        except StreamedAnswerFailed as e:
+            # Already logged by the agent; the partial answer is neither cached nor kept in the session.
+            yield sse_event({"detail": str(e)}, event="error")
+            return
+        except Exception as e:
+            logger.exception("Error while streaming query", extra={"path": "/ask-stream", "query": query})
+            yield sse_event({"detail": f"An internal server error occurred: {str(e)}"}, event="error")
+            return
+        answer = "".join(chunks)
+        if not history:
+            await answer_cache.set(cache_key, answer)
+        if is_cacheable(answer):
+            session_store.append_exchange(session_id, query, answer)
+        yield sse_event({"session_id": session_id}, event="done")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Session-Id": session_id},
+    )
+
+STARTUP_IMPORT_SECONDS.set(round(time.perf_counter() - _import_started, 4))
+
 if __name__ == "__main__":
     print("Starting Uvicorn server for development.")
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
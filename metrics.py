@@ -0,0 +1,307 @@
+# multi_agent_tutor/metrics.py
+"""
+Minimal in-process metrics registry with Prometheus text exposition.
+
+Counters and histograms are process-local; each uvicorn worker exposes its own
+values on GET /metrics.
+"""
+import bisect
+import contextlib
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_REGISTRY = []
+
+
+def _label_key(labelnames, labels):
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _format_labels(labelnames, key, extra=None):
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, key)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, description, labelnames=()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def sum(self, **labels):
+        """Total over every series whose labels include `labels`."""
+        wanted = [(self.labelnames.index(name), str(value)) for name, value in labels.items()]
+        with self._lock:
+            return sum(value for key, value in self._values.items() if all(key[i] == v for i, v in wanted))
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, description, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # key -> [bucket_counts, sum, count]
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """Observes the wall time spent inside the with-block, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (bucket_counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self._value = 0
+        _REGISTRY.append(self)
+
+    def set(self, value):
+        self._value = value
+
+    def render(self):
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} gauge", f"{self.name} {self._value}"]
+
+
+def render_prometheus() -> str:
+    """Renders every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Routing ---
+ROUTING_DECISIONS = Counter(
+    "tutor_routing_decisions_total",
+    "Routing decisions by the source that made them (local = LLM round trip saved).",
+    ("source", "subject"),
+)
+ROUTING_LATENCY = Histogram(
+    "tutor_routing_seconds",
+    "Time spent classifying a query, by classifier.",
+    ("source",),
+)
+ROUTING_AGREEMENT = Counter(
+    "tutor_routing_agreement_total",
+    "Local router guesses compared against the LLM classifier label, by local confidence band.",
+    ("result", "band"),
+)
+
+# --- Fast path ---
+FAST_PATH_ANSWERS = Counter(
+    "tutor_fast_path_answers_total",
+    "Queries answered by the deterministic pre-pass without any LLM call.",
+    ("kind",),
+)
+
+# --- Response cache ---
+CACHE_REQUESTS = Counter(
+    "tutor_cache_requests_total",
+    "Answer cache lookups by tier and result.",
+    ("tier", "result"),
+)
+
+# --- Request coalescing ---
+COALESCED_REQUESTS = Counter(
+    "tutor_coalesced_requests_total",
+    "Pipeline executions by role; each follower is an upstream pipeline run collapsed into a leader's.",
+    ("role",),
+)
+
+# --- HTTP ---
+HTTP_REQUEST_DURATION = Histogram(
+    "tutor_http_request_duration_seconds",
+    "Total request latency until the last body byte was sent.",
+    ("path", "status"),
+)
+HTTP_TIME_TO_FIRST_BYTE = Histogram(
+    "tutor_http_time_to_first_byte_seconds",
+    "Latency until the first body byte was sent.",
+    ("path",),
+)
+
+# --- Sessions ---
+ACTIVE_SESSIONS = Gauge(
+    "tutor_sessions_active",
+    "Conversation sessions currently held in memory by this worker.",
+)
+SESSION_EVICTIONS = Counter(
+    "tutor_session_evictions_total",
+    "Sessions dropped from memory, by reason.",
+    ("reason",),
+)
+PROMPT_HISTORY_TOKENS = Histogram(
+    "tutor_prompt_history_tokens",
+    "Estimated conversation-history tokens sent with each turn.",
+    buckets=(0, 50, 100, 250, 500, 1000, 2000, 4000, 8000),
+)
+
+# --- Tools ---
+MODEL_TURNS = Histogram(
+    "tutor_model_turns",
+    "Model round trips needed to answer a query, by agent.",
+    ("agent",),
+    buckets=(1, 2, 3, 4, 5, 8),
+)
+TOOL_CALLS = Counter(
+    "tutor_tool_calls_total",
+    "Tool calls requested by the model, by agent and tool.",
+    ("agent", "tool"),
+)
+
+# --- Upstream gate ---
+UPSTREAM_IN_FLIGHT = Gauge(
+    "tutor_upstream_in_flight",
+    "Gemini calls currently holding an upstream slot.",
+)
+UPSTREAM_WAIT = Histogram(
+    "tutor_upstream_wait_seconds",
+    "Time a Gemini call waited for a concurrency slot and rate-limit budget.",
+    ("call_site",),
+)
+UPSTREAM_REJECTIONS = Counter(
+    "tutor_upstream_rejections_total",
+    "Gemini calls shed before being sent, by reason.",
+    ("call_site", "reason"),
+)
+UPSTREAM_RETRIES = Counter(
+    "tutor_upstream_retries_total",
+    "Retries of retryable Gemini errors.",
+    ("call_site", "error"),
+)
+UPSTREAM_ERRORS = Counter(
+    "tutor_upstream_errors_total",
+    "Gemini calls that failed after retries (or with a non-retryable error).",
+    ("call_site", "error"),
+)
+UPSTREAM_CALLS = Counter(
+    "tutor_upstream_calls_total",
+    "Calls sent to the LLM backend, including retries.",
+    ("call_site",),
+)
+
+UPSTREAM_TIMEOUTS = Counter(
+    "tutor_upstream_timeouts_total",
+    "Model calls cut off by their stage timeout or by the request deadline.",
+    ("call_site",),
+)
+UPSTREAM_HEDGES = Counter(
+    "tutor_upstream_hedges_total",
+    "Hedged duplicate calls: 'launched' once the first call was slow, 'won' when the duplicate answered first.",
+    ("call_site", "result"),
+)
+UPSTREAM_FALLBACKS = Counter(
+    "tutor_upstream_fallbacks_total",
+    "Model calls sent to FALLBACK_GEMINI_MODEL because the default model was slow or failing.",
+    ("call_site",),
+)
+DEADLINES_EXCEEDED = Counter(
+    "tutor_deadlines_exceeded_total",
+    "Requests that ran out of their REQUEST_TIMEOUT_SECONDS budget, by the call that hit it.",
+    ("call_site",),
+)
+
+# --- Pipeline stages ---
+STAGE_LATENCY = Histogram(
+    "tutor_stage_duration_seconds",
+    "Latency of each answer stage: classification, first_generation (first model turn), "
+    "tool_execution (all tool calls of one turn) and final_generation (model turns after tool results).",
+    ("stage", "agent"),
+)
+
+# --- Logging ---
+LOG_RECORDS_DROPPED = Counter(
+    "tutor_log_records_dropped_total",
+    "Log records dropped because the logging queue was full.",
+)
+
+# --- Tracing ---
+TRACES_DROPPED = Counter(
+    "tutor_traces_dropped_total",
+    "Traces dropped because the trace export queue was full.",
+)
+
+# --- Startup ---
+STARTUP_IMPORT_SECONDS = Gauge(
+    "tutor_startup_import_seconds",
+    "Time taken to import the application module.",
+)
+STARTUP_WARMUP_SECONDS = Gauge(
+    "tutor_startup_warmup_seconds",
+    "Time taken by the background warmup (LLM backend, agents, provider connection).",
+)
+SERVICE_READY = Gauge(
+    "tutor_ready",
+    "1 once startup warmup has finished and the service reports ready, else 0.",
+)
+
+# --- Tokens ---
+LLM_TOKENS = Counter(
+    "tutor_llm_tokens_total",
+    "Prompt and output tokens reported by the model, by agent (or call site: classifier, general).",
+    ("agent", "kind"),
+)
+REQUEST_TOKENS = Histogram(
+    "tutor_request_tokens",
+    "Prompt and output tokens spent on one model-generated answer, across all of its model calls.",
+    ("kind",),
+    buckets=(0, 50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000),
+)
+TOKEN_BUDGET_EXHAUSTED = Counter(
+    "tutor_token_budget_exhausted_total",
+    "Answers whose tool rounds were cut short because the request reached REQUEST_TOKEN_BUDGET.",
+    ("agent",),
+)
@@ -0,0 +1,119 @@
+# multi_agent_tutor/response_cache.py
+"""
+Answer cache for /ask.
+
+Two tiers:
+  * an in-memory LRU with per-entry TTL (per worker process), and
+  * an optional SQLite file shared by every uvicorn worker on the host.
+
+Keys combine the normalized query with the model name and the prompt version,
+so changing a model or a system instruction never serves a stale answer.
+"""
+import asyncio
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from metrics import CACHE_REQUESTS
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?.!]+$")
+
+# Fallback answers produced when generation fails; never worth caching.
+_ERROR_PREFIXES = ("sorry,", "math agent: sorry", "physics agent: sorry")
+
+
+def normalize_query(query: str) -> str:
+    """Case-folds, collapses whitespace and drops trailing punctuation so trivially different queries share a key."""
+    normalized = query.casefold().replace("’", "'")
+    normalized = _WHITESPACE.sub(" ", normalized).strip()
+    return _TRAILING_PUNCTUATION.sub("", normalized)
+
+
+def is_cacheable(answer: str) -> bool:
+    return bool(answer and answer.strip()) and not answer.strip().lower().startswith(_ERROR_PREFIXES)
+
+
+class ResponseCache:
+    def __init__(self, max_entries=1024, ttl_seconds=3600.0, db_path=None, max_disk_entries=100_000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()  # key -> (expires_at, answer)
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._disk_writes = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=5.0)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, answer TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS answers_expires_at ON answers (expires_at)")
+
+    @staticmethod
+    def make_key(query: str, model_name: str, prompt_version: str) -> str:
+        raw = f"{model_name}\0{prompt_version}\0{normalize_query(query)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str):
+        """Returns the cached answer for key, or None on a miss in every tier."""
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, answer = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                CACHE_REQUESTS.inc(tier="memory", result="hit")
+                return answer
+            del self._memory[key]
+        CACHE_REQUESTS.inc(tier="memory", result="miss")
+
+        if self._db is None:
+            return None
+        row = await asyncio.to_thread(self._disk_get, key, now)
+        if row is None:
+            CACHE_REQUESTS.inc(tier="disk", result="miss")
+            return None
+        CACHE_REQUESTS.inc(tier="disk", result="hit")
+        answer, expires_at = row
+        self._memory_set(key, answer, expires_at)
+        return answer
+
+    async def set(self, key: str, answer: str):
+        if not is_cacheable(answer):
+            return
+        expires_at = time.time() + self.ttl_seconds
+        self._memory_set(key, answer, expires_at)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_set, key, answer, expires_at)
+
+    def _memory_set(self, key, answer, expires_at):
+        self._memory[key] = (expires_at, answer)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key, now):
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT answer, expires_at FROM answers WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+
+    def _disk_set(self, key, answer, expires_at):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO answers (key, answer, expires_at) VALUES (?, ?, ?)", (key, answer, expires_at)
+            )
+            self._disk_writes += 1
+            # Purge expired rows and trim to size every so often rather than on every write.
+            if self._disk_writes % 256 == 0:
+                self._db.execute("DELETE FROM answers WHERE expires_at <= ?", (time.time(),))
+                self._db.execute(
+                    "DELETE FROM answers WHERE key IN (SELECT key FROM answers ORDER BY expires_at ASC "
+                    "LIMIT max(0, (SELECT count(*) FROM answers) - ?))",
+                    (self.max_disk_entries,),
+                )
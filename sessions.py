@@ -0,0 +1,107 @@
+# multi_agent_tutor/sessions.py
+"""
+Per-session conversation memory for /ask.
+
+Each session keeps a bounded, compact history:
+  * at most `max_turns` user/model exchanges,
+  * at most `max_tokens` estimated tokens in total (oldest exchanges are dropped first),
+  * each stored message clipped to `max_chars_per_message`.
+
+Sessions are kept in LRU order, evicted after `idle_ttl_seconds` without use and
+capped at `max_sessions`, so memory stays flat no matter how many clients connect.
+"""
+import time
+import uuid
+from collections import OrderedDict, deque
+from metrics import ACTIVE_SESSIONS, SESSION_EVICTIONS
+
+CLIPPED_SUFFIX = " [...]"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token) that avoids a count_tokens round trip."""
+    return len(text) // 4 + 1
+
+
+class ConversationHistory:
+    __slots__ = ("exchanges", "tokens", "last_used")
+
+    def __init__(self):
+        self.exchanges = deque()  # (user_text, model_text, tokens)
+        self.tokens = 0
+        self.last_used = time.monotonic()
+
+    def as_contents(self) -> list:
+        """Returns the history in the role/parts format accepted by the Gemini SDK."""
+        contents = []
+        for user_text, model_text, _ in self.exchanges:
+            contents.append({"role": "user", "parts": [user_text]})
+            contents.append({"role": "model", "parts": [model_text]})
+        return contents
+
+
+class SessionStore:
+    def __init__(self, max_sessions=10_000, max_turns=10, max_tokens=2_000,
+                 max_chars_per_message=2_000, idle_ttl_seconds=1_800.0):
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.max_chars_per_message = max_chars_per_message
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._sessions = OrderedDict()  # session_id -> ConversationHistory, least recently used first
+
+    @staticmethod
+    def new_session_id() -> str:
+        return uuid.uuid4().hex
+
+    def get_history(self, session_id: str):
+        """
+        Returns (contents, estimated_tokens) for the session's history in SDK format.
+        Unknown or expired sessions have an empty history.
+        """
+        self._evict_idle()
+        session = self._sessions.get(session_id)
+        if session is None:
+            return [], 0
+        session.last_used = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        return session.as_contents(), session.tokens
+
+    def append_exchange(self, session_id: str, user_text: str, model_text: str):
+        self._evict_idle()
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = ConversationHistory()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                SESSION_EVICTIONS.inc(reason="capacity")
+        session.last_used = time.monotonic()
+        self._sessions.move_to_end(session_id)
+
+        user_text = self._clip(user_text)
+        model_text = self._clip(model_text)
+        tokens = estimate_tokens(user_text) + estimate_tokens(model_text)
+        session.exchanges.append((user_text, model_text, tokens))
+        session.tokens += tokens
+        # Truncation policy: drop the oldest exchanges first, but always keep the latest one.
+        while len(session.exchanges) > 1 and (len(session.exchanges) > self.max_turns or session.tokens > self.max_tokens):
+            session.tokens -= session.exchanges.popleft()[2]
+        ACTIVE_SESSIONS.set(len(self._sessions))
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _clip(self, text: str) -> str:
+        if len(text) <= self.max_chars_per_message:
+            return text
+        return text[:self.max_chars_per_message - len(CLIPPED_SUFFIX)] + CLIPPED_SUFFIX
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_ttl_seconds
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_used > cutoff:
+                break
+            del self._sessions[session_id]
+            SESSION_EVICTIONS.inc(reason="idle")
+        ACTIVE_SESSIONS.set(len(self._sessions))
@@ -0,0 +1,36 @@
+# multi_agent_tutor/singleflight.py
+"""
+Request coalescing: concurrent calls with the same key share one execution.
+
+The shared work runs as its own task, so a leader whose client disconnects
+does not cancel the pipeline for the followers waiting on it.
+"""
+import asyncio
+from metrics import COALESCED_REQUESTS
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight = {}  # key -> asyncio.Task
+
+    async def do(self, key, coroutine_fn):
+        """
+        Runs coroutine_fn() once per key at a time. Callers that arrive while it is
+        running wait for and receive the same result (or exception).
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            COALESCED_REQUESTS.inc(role="leader")
+            task = asyncio.ensure_future(coroutine_fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._finish(key, done))
+        else:
+            COALESCED_REQUESTS.inc(role="follower")
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter went away.
+        if not task.cancelled():
+            task.exception()
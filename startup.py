@@ -0,0 +1,59 @@
+# multi_agent_tutor/startup.py
+"""
+Startup warmup and readiness.
+
+Importing the app does no expensive work: the LLM SDK, the agents and their models are
+created lazily. The FastAPI lifespan hook starts `warmup.run(...)` in the background so
+that this work happens right after boot instead of on the first request, and GET /ready
+answers 503 until it has finished, so load balancers and autoscalers only send traffic
+to warm workers. Requests that arrive earlier are still served; they just pay for the
+initialization themselves.
+"""
+import asyncio
+import time
+from metrics import STARTUP_WARMUP_SECONDS, SERVICE_READY
+from structured_logging import get_logger
+
+logger = get_logger("startup")
+
+STARTING, READY, FAILED = "starting", "ready", "failed"
+
+
+class Warmup:
+    def __init__(self):
+        self.state = STARTING
+        self.error = None
+        self.duration_seconds = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    def mark_ready(self, duration_seconds: float = 0.0):
+        self.state = READY
+        self.duration_seconds = duration_seconds
+        STARTUP_WARMUP_SECONDS.set(round(duration_seconds, 4))
+        SERVICE_READY.set(1)
+
+    async def run(self, *steps):
+        """Awaits each warmup coroutine function in order; any failure marks the service not ready."""
+        start = time.perf_counter()
+        try:
+            for step in steps:
+                await step()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.state, self.error = FAILED, f"{type(e).__name__}: {e}"
+            logger.error("Warmup failed", extra={"error": self.error})
+            return
+        self.mark_ready(time.perf_counter() - start)
+        logger.info("Warmup finished", extra={"duration_seconds": round(self.duration_seconds, 4)})
+
+    def status(self) -> dict:
+        status = {"status": self.state}
+        if self.duration_seconds is not None:
+            status["warmup_seconds"] = round(self.duration_seconds, 4)
+        if self.error is not None:
+            status["error"] = self.error
+        return status
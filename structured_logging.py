@@ -0,0 +1,127 @@
+# multi_agent_tutor/structured_logging.py
+"""
+Structured, non-blocking logging.
+
+Request handlers only put records on an in-memory queue; a QueueListener thread
+formats them as JSON lines and writes them to stdout, so slow or contended stdout
+never stalls the event loop. When the queue is full, records are dropped and counted
+rather than blocking.
+
+Structured fields are passed with `extra`, e.g.
+    logger.info("Routed query", extra={"subject": "math", "source": "local"})
+Large payloads such as full model answers go in `extra={"payload": ..., "verbose": True}`;
+only a LOG_VERBOSE_SAMPLE_RATE fraction of those records is kept, truncated to
+LOG_MAX_PAYLOAD_CHARS.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+from config import LOG_LEVEL, LOG_FORMAT, LOG_QUEUE_MAX_SIZE, LOG_VERBOSE_SAMPLE_RATE, LOG_MAX_PAYLOAD_CHARS
+from metrics import LOG_RECORDS_DROPPED
+
+ROOT_LOGGER_NAME = "tutor"
+
+# Attributes every LogRecord has; anything else on a record came from `extra`.
+_STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRIBUTES and key != "verbose":
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class VerboseSampler(logging.Filter):
+    """Keeps a sample of records marked verbose=True and truncates their payload."""
+
+    def __init__(self, sample_rate: float, max_payload_chars: int):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.max_payload_chars = max_payload_chars
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "verbose", False):
+            return True
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return False
+        payload = getattr(record, "payload", None)
+        if isinstance(payload, str) and len(payload) > self.max_payload_chars:
+            record.payload = payload[:self.max_payload_chars] + f"... ({len(payload)} chars)"
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full."""
+
+    def prepare(self, record):
+        # The base class formats the record here, on the caller's thread, and drops exc_info.
+        # Only the message arguments (possibly mutable objects) are merged now; formatting,
+        # tracebacks included, happens on the listener thread.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+def configure_logging():
+    """Routes the 'tutor' logger hierarchy through the queue. Safe to call more than once."""
+    global _listener
+    if _listener is not None:
+        return
+    output = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        formatter.converter = time.gmtime
+        output.setFormatter(formatter)
+
+    handler = DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_MAX_SIZE))
+    handler.addFilter(VerboseSampler(LOG_VERBOSE_SAMPLE_RATE, LOG_MAX_PAYLOAD_CHARS))
+
+    root = logging.getLogger(ROOT_LOGGER_NAME)
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(handler)
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flushes queued records and stops the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Returns a logger under the 'tutor' hierarchy, configuring the queue on first use."""
+    configure_logging()
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}")
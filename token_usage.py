@@ -0,0 +1,77 @@
+# multi_agent_tutor/token_usage.py
+"""
+Per-request token accounting and budget.
+
+`TutorAgent.route_query` opens a `track_usage(budget)` block next to its deadline; like
+the deadline, the RequestUsage lives in a contextvar, so every model call made for the
+request adds its prompt and output tokens to it, per agent, without it being passed
+around. Agents check `exhausted` before starting another tool round, so one request
+cannot spend more than REQUEST_TOKEN_BUDGET on tool loops.
+"""
+import contextlib
+import contextvars
+from metrics import LLM_TOKENS
+
+_usage = contextvars.ContextVar("request_token_usage", default=None)
+
+
+class RequestUsage:
+    __slots__ = ("budget", "by_agent")
+
+    def __init__(self, budget: int = 0):
+        self.budget = budget  # 0 means unlimited
+        self.by_agent = {}  # agent -> [prompt_tokens, output_tokens]
+
+    def add(self, agent: str, prompt_tokens: int, output_tokens: int):
+        tokens = self.by_agent.setdefault(agent, [0, 0])
+        tokens[0] += prompt_tokens
+        tokens[1] += output_tokens
+
+    @property
+    def prompt_tokens(self) -> int:
+        return sum(prompt for prompt, _ in self.by_agent.values())
+
+    @property
+    def output_tokens(self) -> int:
+        return sum(output for _, output in self.by_agent.values())
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.output_tokens
+
+    @property
+    def exhausted(self) -> bool:
+        return self.budget > 0 and self.total_tokens >= self.budget
+
+    def as_dict(self) -> dict:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "by_agent": {agent: {"prompt_tokens": p, "output_tokens": o} for agent, (p, o) in self.by_agent.items()},
+        }
+
+
+@contextlib.contextmanager
+def track_usage(budget: int = 0):
+    """Accounts the model calls of the with-block (one answer) in a fresh RequestUsage, which it yields."""
+    usage = RequestUsage(budget)
+    token = _usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage.reset(token)
+
+
+def current_usage():
+    """The RequestUsage of the answer being produced, or None outside track_usage."""
+    return _usage.get()
+
+
+def record_usage(agent: str, response):
+    """Adds one model response's token counts to the metrics and to the current request's usage."""
+    prompt_tokens, output_tokens = response.prompt_tokens, response.output_tokens
+    LLM_TOKENS.inc(prompt_tokens, agent=agent, kind="prompt")
+    LLM_TOKENS.inc(output_tokens, agent=agent, kind="output")
+    usage = _usage.get()
+    if usage is not None:
+        usage.add(agent, prompt_tokens, output_tokens)
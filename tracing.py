@@ -0,0 +1,218 @@
+# multi_agent_tutor/tracing.py
+"""
+Lightweight in-process tracing.
+
+The HTTP middleware starts one trace per sampled request; code on the request path
+opens child spans with `with span("name", key=value) as s:` and attaches attributes
+(e.g. token counts) with `s.set(...)`. The current span is tracked in a contextvar, so
+spans nest across awaits, asyncio.gather and asyncio.to_thread without being passed
+around. Outside a sampled trace `span()` yields a shared no-op span and costs well
+under a microsecond, so tracing can stay on in production.
+
+Finished traces are written by a background thread as OTLP/JSON
+(ExportTraceServiceRequest) lines to TRACE_EXPORT_PATH, the format of the
+OpenTelemetry collector's file exporter, so they can be replayed into any OTLP
+backend.
+"""
+import contextlib
+import contextvars
+import json
+import queue
+import random
+import threading
+import time
+from config import TRACE_SAMPLE_RATE, TRACE_EXPORT_PATH, TRACE_EXPORT_QUEUE_SIZE
+from metrics import TRACES_DROPPED
+
+SERVICE_NAME = "multi-agent-tutor"
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "trace", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error", "_token")
+
+    def __init__(self, name, trace, parent_id, attributes):
+        self.name = name
+        self.trace = trace
+        self.span_id = "%016x" % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.error = None
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        self.end(exc)
+        return False
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self, error: BaseException = None):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            if error is not None:
+                self.error = f"{type(error).__name__}: {error}"
+            self.trace.spans.append(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+    def end(self, error: BaseException = None):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self):
+        self.trace_id = "%032x" % random.getrandbits(128)
+        self.spans = []  # finished spans, in end order
+
+
+def span(name: str, **attributes):
+    """Returns a child of the current span; use it as a with-block to make it current until the block exits."""
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(name, parent.trace, parent.span_id, attributes)
+
+
+def start_span(name: str, **attributes):
+    """
+    Starts a child of the current span without making it current; call .end() on it.
+    For async generators, whose body may resume in a different context than it started in.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(name, parent.trace, parent.span_id, attributes)
+
+
+def start_trace(name: str, force: bool = False, **attributes):
+    """
+    Returns the root span of a new trace, or None when the request is not sampled.
+    Without an exporter, only forced traces (X-Debug-Timing) are recorded.
+    """
+    if not force and (_exporter is None or TRACE_SAMPLE_RATE <= 0 or random.random() >= TRACE_SAMPLE_RATE):
+        return None
+    return Span(name, Trace(), None, attributes)
+
+
+@contextlib.contextmanager
+def use_span(current):
+    """Makes `current` (a root from start_trace, or None) the current span for the with-block."""
+    if current is None:
+        yield
+        return
+    token = _current_span.set(current)
+    try:
+        yield
+    finally:
+        _current_span.reset(token)
+
+
+def finish_trace(root: Span, error: BaseException = None):
+    """Ends the root span and hands the trace to the exporter."""
+    root.end(error)
+    if _exporter is not None:
+        _exporter.export(root.trace)
+
+
+def timing_header(root: Span) -> str:
+    """Server-Timing style summary of the spans finished so far, e.g. for X-Debug-Timing."""
+    entries = [f"trace;desc={root.trace.trace_id}"]
+    for finished in sorted(root.trace.spans, key=lambda s: s.start_ns):
+        entries.append(f"{finished.name.replace(' ', '_')};dur={finished.duration_ms:.1f}")
+    entries.append(f"total;dur={root.duration_ms:.1f}")
+    return ", ".join(entries)
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict) -> list:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+def to_otlp_json(trace: Trace) -> dict:
+    """Converts a finished trace to an OTLP/JSON ExportTraceServiceRequest."""
+    spans = []
+    for finished in trace.spans:
+        otlp_span = {
+            "traceId": trace.trace_id,
+            "spanId": finished.span_id,
+            "name": finished.name,
+            "kind": 2 if finished.parent_id is None else 1,  # SERVER for the root, INTERNAL otherwise
+            "startTimeUnixNano": str(finished.start_ns),
+            "endTimeUnixNano": str(finished.end_ns),
+            "attributes": _otlp_attributes(finished.attributes),
+            "status": {"code": 2, "message": finished.error} if finished.error else {"code": 1},
+        }
+        if finished.parent_id is not None:
+            otlp_span["parentSpanId"] = finished.parent_id
+        spans.append(otlp_span)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+            "scopeSpans": [{"scope": {"name": "tutor.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+class OtlpJsonFileExporter:
+    """Appends one OTLP/JSON line per trace to a file from a background thread."""
+
+    def __init__(self, path: str, max_queue: int = TRACE_EXPORT_QUEUE_SIZE):
+        self.path = path
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, trace: Trace):
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            TRACES_DROPPED.inc()
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                trace = self._queue.get()
+                f.write(json.dumps(to_otlp_json(trace)) + "\n")
+                if self._queue.empty():
+                    f.flush()
+
+
+_exporter = OtlpJsonFileExporter(TRACE_EXPORT_PATH) if TRACE_EXPORT_PATH else None